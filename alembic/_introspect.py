@@ -0,0 +1,149 @@
+"""Кэш интроспекции схемы для ревизий alembic.
+
+Лежит рядом с env.py, а не в versions/: alembic считает ревизией каждый
+.py в versions/ и падает на файле без ``revision``. Ревизии загружают его
+через ``alembic.util.load_python_file``.
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+
+# Каталог целиком (таблица, индекс|NULL); для прочих диалектов — Inspector.
+_CATALOG_SQL = {
+    "postgresql": (
+        "SELECT table_name, NULL FROM information_schema.tables"
+        " WHERE table_schema = current_schema() AND table_type = 'BASE TABLE'"
+        " UNION ALL"
+        " SELECT tablename, indexname FROM pg_indexes WHERE schemaname = current_schema()"
+    ),
+    "sqlite": (
+        "SELECT tbl_name, CASE type WHEN 'index' THEN name END FROM sqlite_master"
+        " WHERE type IN ('table', 'index') AND tbl_name NOT LIKE 'sqlite_%'"
+    ),
+}
+
+# Диалекты, где CREATE TABLE/INDEX понимают IF NOT EXISTS, а DROP — IF EXISTS
+# (как в 0001).
+_IF_NOT_EXISTS_DIALECTS = ("postgresql", "sqlite")
+
+
+class Introspect:
+    """Один снимок схемы на ревизию.
+
+    На PostgreSQL и SQLite таблицы и индексы читаются одним запросом к
+    каталогу при первом обращении, колонки — через Inspector по таблице.
+    Дальше всё берётся из кэша. DDL, выполненный самой ревизией,
+    в кэш не попадает — после create_table вызывайте ``add_table``.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._insp = None
+        self._tables: set[str] | None = None
+        self._indexes: dict[str, set[str]] = {}
+        self._columns: dict[str, set[str]] = {}
+
+    def _inspector(self):
+        if self._insp is None:
+            self._insp = inspect(self._conn)
+        return self._insp
+
+    def _load_tables(self) -> None:
+        self._tables = set()
+        sql = _CATALOG_SQL.get(self._conn.dialect.name)
+        if sql is None:
+            try:
+                self._tables.update(self._inspector().get_table_names())
+            except Exception:
+                pass
+            return
+        # Таблицы и индексы схемы — одним запросом к каталогу.
+        for table, index in self._conn.exec_driver_sql(sql):
+            self._tables.add(table)
+            names = self._indexes.setdefault(table, set())
+            if index:
+                names.add(index)
+
+    @property
+    def if_not_exists(self) -> bool:
+        """Существующие таблицы/индексы пропускает сама БД (IF NOT EXISTS)."""
+        return self._conn.dialect.name in _IF_NOT_EXISTS_DIALECTS
+
+    @property
+    def if_exists(self) -> bool:
+        """Отсутствующие таблицы/индексы пропускает сама БД (DROP ... IF EXISTS)."""
+        return self._conn.dialect.name in _IF_NOT_EXISTS_DIALECTS
+
+    def should_create_table(self, name: str) -> bool:
+        # С IF NOT EXISTS каталог не читаем вовсе.
+        return self.if_not_exists or not self.has_table(name)
+
+    def should_create_index(self, table: str, name: str) -> bool:
+        return self.if_not_exists or (self.has_table(table) and not self.has_index(table, name))
+
+    def should_drop_table(self, name: str) -> bool:
+        return self.if_exists or self.has_table(name)
+
+    def should_drop_index(self, table: str, name: str) -> bool:
+        return self.if_exists or self.has_index(table, name)
+
+    def has_table(self, name: str) -> bool:
+        if self._tables is None:
+            self._load_tables()
+        return name in self._tables
+
+    def has_index(self, table: str, name: str) -> bool:
+        if not self.has_table(table):
+            return False
+        names = self._indexes.get(table)
+        if names is None:
+            try:
+                names = {ix.get("name") for ix in self._inspector().get_indexes(table)}
+            except Exception:
+                names = set()
+            self._indexes[table] = names
+        return name in names
+
+    def has_column(self, table: str, name: str) -> bool:
+        if not self.has_table(table):
+            return False
+        names = self._columns.get(table)
+        if names is None:
+            try:
+                names = {c.get("name") for c in self._inspector().get_columns(table)}
+            except Exception:
+                names = set()
+            self._columns[table] = names
+        return name in names
+
+    def add_table(self, name: str) -> None:
+        """Отметить таблицу, только что созданную ревизией."""
+        if self._tables is not None:
+            self._tables.add(name)
+        # Индексы и колонки новой таблицы перечитаются при первом запросе.
+        self._indexes.pop(name, None)
+        self._columns.pop(name, None)
+
+    def add_missing_columns(self, table: str, columns: list[sa.Column]) -> None:
+        """Добавить в таблицу колонки, которых в ней ещё нет.
+
+        На PostgreSQL — одним ALTER TABLE: одна блокировка таблицы вместо
+        блокировки на каждую колонку.
+        """
+        columns = [c for c in columns if not self.has_column(table, c.name)]
+        if not columns:
+            return
+        dialect = self._conn.dialect
+        if dialect.name == "postgresql":
+            # CreateColumn компилирует колонку только в составе таблицы.
+            sa.Table(table, sa.MetaData(), *columns)
+            clauses = ", ".join(f"ADD COLUMN {CreateColumn(c).compile(dialect=dialect)}" for c in columns)
+            op.execute(f"ALTER TABLE {dialect.identifier_preparer.quote(table)} {clauses}")
+        else:
+            for column in columns:
+                op.add_column(table, column)
+        self._columns.setdefault(table, set()).update(c.name for c in columns)
@@ -1,58 +1,246 @@
 from __future__ import annotations
-import os, sys
-from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool, text
+import glob, hashlib, importlib.util, os, pickle, sys, types
+import logging.config
+from sqlalchemy import engine_from_config, make_url, pool
 from alembic import context
+from alembic.runtime.migration import MigrationContext
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+_CACHE_DIR = os.path.join(_ROOT, ".alembic_cache")
 
 config = context.config
-db_uri = os.environ.get("DATABASE_URI") or os.environ.get("DATABASE_URL")
-if db_uri:
-    config.set_main_option("sqlalchemy.url", db_uri)
+_DB_URI = (
+    os.environ.get("DATABASE_URI")
+    or os.environ.get("DATABASE_URL")
+    or config.get_main_option("sqlalchemy.url")
+)
+if _DB_URI:
+    config.set_main_option("sqlalchemy.url", _DB_URI)
 
-if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+if "postgres" in (_DB_URI or ""):
+    # Прод — Postgres: грузим диалект сразу, а не на первом запросе.
+    import sqlalchemy.dialects.postgresql  # noqa: F401
+    import alembic.ddl.postgresql  # noqa: F401
+
+# То же, что секции [loggers]/[handlers]/[formatters] стандартного alembic.ini,
+# но без разбора INI и повторной настройки логгеров на каждый запуск.
+_LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "generic": {"format": "%(levelname)-5.5s [%(name)s] %(message)s", "datefmt": "%H:%M:%S"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "stream": "ext://sys.stderr", "formatter": "generic"},
+    },
+    "root": {"level": "WARNING", "handlers": ["console"]},
+    "loggers": {
+        "sqlalchemy.engine": {"level": "WARNING"},
+        "alembic": {"level": "INFO"},
+    },
+}
+
+if not logging.getLogger().handlers:
+    logging.config.dictConfig(_LOGGING)
 
 target_metadata = None
 
+# Модули, объявляющие модели на db.metadata. create_app() подтягивает
+# app.event_chat.models только через регистрацию blueprint'а, поэтому
+# перечисляем их явно.
+_MODEL_MODULES = (
+    "app.models",
+    "app.event_chat.models",
+)
+
+def _metadata_cache_path() -> str:
+    # Ключ кэша — хэш исходников app/: любая правка моделей даёт новый файл.
+    h = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(_ROOT, "app", "**", "*.py"), recursive=True)):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return os.path.join(_CACHE_DIR, f"metadata-{h.hexdigest()}.pkl")
+
+def _schema_only_copy(metadata):
+    # Flask-SQLAlchemy Table и python-side default=lambda не сериализуются;
+    # autogenerate они не нужны, поэтому в кэш кладём "голую" схему.
+    from sqlalchemy import MetaData
+    copy = MetaData(naming_convention=metadata.naming_convention)
+    for table in metadata.sorted_tables:
+        for column in table.to_metadata(copy).columns:
+            column.default = None
+            column.onupdate = None
+    return copy
+
+def _import_app_package():
+    # Подключаем только пакет app по известному пути, не добавляя корень
+    # репозитория в sys.path (иначе каждый последующий import сканирует его).
+    if "app" in sys.modules:
+        return
+    package_dir = os.path.join(_ROOT, "app")
+    spec = importlib.util.spec_from_file_location(
+        "app",
+        os.path.join(package_dir, "__init__.py"),
+        submodule_search_locations=[package_dir],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["app"] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules["app"]
+        raise
+
 def _get_target_metadata():
     global target_metadata
     if target_metadata is not None:
         return target_metadata
-    from app import create_app
+
+    # Нужен и при чтении кэша: pickle ссылается на типы из app.models.
+    _import_app_package()
+    cache_path = _metadata_cache_path()
+    try:
+        with open(cache_path, "rb") as f:
+            target_metadata = pickle.load(f)
+        return target_metadata
+    except Exception:
+        pass
+
+    # Для MetaData не нужны ни blueprint'ы, ни app_context, ни create_all():
+    # достаточно импортировать модули с моделями.
     from app.extensions import db
-    app = create_app()
-    with app.app_context():
-        target_metadata = db.metadata
+    for name in _MODEL_MODULES:
+        importlib.import_module(name)
+    target_metadata = db.metadata
+
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump(_schema_only_copy(target_metadata), f, protocol=5)
+    except Exception:
+        # Кэш — только ускорение: при ошибке записи работаем без него.
+        pass
     return target_metadata
 
+def _metadata_for_command():
+    # MetaData нужна только autogenerate (revision --autogenerate, check).
+    # upgrade/downgrade/stamp/current её не читают — не тратим время на импорт.
+    opts = config.cmd_opts
+    if opts is None:
+        # Вызов через alembic.command из кода: команда неизвестна.
+        return _get_target_metadata()
+    fn = opts.cmd[0] if getattr(opts, "cmd", None) else None
+    name = getattr(fn, "__name__", "")
+    if name == "check" or (name == "revision" and getattr(opts, "autogenerate", False)):
+        return _get_target_metadata()
+    return None
+
 def run_migrations_offline() -> None:
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
-        target_metadata=_get_target_metadata(),
+        url=_DB_URI,
+        target_metadata=_metadata_for_command(),
+        # --sql пишет скрипт для psql: параметры должны быть подставлены.
+        # Каждый DDL компилируется ровно один раз, кэш компиляции тут
+        # ничего не даёт, а literal_binds=False дал бы нерабочий SQL.
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        include_schemas=False,
     )
     with context.begin_transaction():
         context.run_migrations()
 
+# Alembic исполняет env.py заново на каждую команду (новый объект модуля),
+# поэтому движки держим в отдельном модуле процесса: так они переживают
+# повторные command.upgrade() внутри одного процесса (воркеры, тесты).
+# Модуль регистрируется в sys.modules один раз. Ключ — URL БД.
+_STATE_MODULE = "_map_alembic_state"
+
+def _process_state() -> types.ModuleType:
+    state = sys.modules.get(_STATE_MODULE)
+    if state is None:
+        state = types.ModuleType(_STATE_MODULE, "Состояние env.py на весь процесс.")
+        state.engines = {}
+        sys.modules[_STATE_MODULE] = state
+    return state
+
+_ENGINES = _process_state().engines
+
+def _get_engine():
+    section = config.get_section(config.config_ini_section)
+    if os.environ.get("ALEMBIC_FORK_SAFE"):
+        # Пул нельзя делить между fork'ами — в этом режиме соединение
+        # открывается на каждый запуск.
+        return engine_from_config(section, prefix="sqlalchemy.", poolclass=pool.NullPool)
+    url = section["sqlalchemy.url"]
+    engine = _ENGINES.get(url)
+    if engine is None:
+        connect_args = {}
+        if make_url(url).get_backend_name() == "postgresql":
+            # Видно в pg_stat_activity/логах; таймауты ролей не рвут
+            # долгие миграции.
+            connect_args = {"application_name": "alembic", "options": "-c statement_timeout=0"}
+        # env.py работает с одним соединением: пул ровно из одного, без
+        # overflow. В отличие от StaticPool, QueuePool отдаёт соединение
+        # одному потоку за раз и пересоздаёт его после pre_ping.
+        engine = _ENGINES[url] = engine_from_config(
+            section,
+            prefix="sqlalchemy.",
+            poolclass=pool.QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+    return engine
+
+def _current_heads(connection) -> set:
+    current = set(MigrationContext.configure(connection).get_current_heads())
+    # SELECT из alembic_version открыл транзакцию — закрываем её, чтобы
+    # context.configure() не принял её за внешнюю.
+    connection.rollback()
+    return current
+
+def _already_at_head(current: set) -> bool:
+    # entrypoint_web.sh запускает `alembic upgrade head` на каждом старте
+    # контейнера; обычно применять нечего. -x force отключает проверку.
+    if "force" in context.get_x_argument():
+        return False
+    # Целевая ревизия команды — и из CLI, и из alembic.command.upgrade()
+    # в коде (там cmd_opts нет). "head"/"heads" и явный id головной
+    # ревизии разрешаются в одно и то же; если БД уже там, команде делать
+    # нечего (upgrade и stamp — no-op).
+    try:
+        target = context.get_revision_argument()
+    except KeyError:
+        # current/history/revision: целевой ревизии у команды нет.
+        return False
+    heads = set(context.script.get_heads())
+    if set(target if isinstance(target, tuple) else (target,)) != heads:
+        return False
+    return current == heads
+
 def run_migrations_online() -> None:
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-    with connectable.connect() as connection:
-        if connection.dialect.name == "postgresql":
-            connection.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
-            connection.commit()
+    with _get_engine().connect() as connection:
+        current = _current_heads(connection)
+        if _already_at_head(current):
+            logging.getLogger("alembic.env").info("Database is already at head, nothing to upgrade.")
+            return
         context.configure(
             connection=connection,
-            target_metadata=_get_target_metadata(),
+            target_metadata=_metadata_for_command(),
             compare_type=True,
+            # Одна схема: autogenerate (alembic>=1.18) отражает её пачкой
+            # через Inspector.get_multi_*, а не по таблице за запрос.
+            include_schemas=False,
+            # Своя транзакция на каждую ревизию: DDL-блокировки снимаются
+            # после её коммита, а не держатся до конца всей цепочки.
+            # Исключение — пустая БД (ревизий ещё нет): блокировать некого,
+            # и на PostgreSQL вся цепочка идёт одной транзакцией — COMMIT
+            # только в конце и вокруг autocommit_block() с CONCURRENTLY,
+            # а не после каждой ревизии. Для SQLite alembic (нет
+            # транзакционного DDL) всё равно коммитит по ревизии.
+            transaction_per_migration=bool(current),
         )
         with context.begin_transaction():
             context.run_migrations()
@@ -10,6 +10,9 @@ from __future__ import annotations
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy import inspect
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql.functions import FunctionElement
 
 
 # revision identifiers, used by Alembic.
@@ -19,69 +22,214 @@ branch_labels = None
 depends_on = None
 
 
-def _table_exists(conn, table_name: str) -> bool:
-    insp = inspect(conn)
-    return table_name in set(insp.get_table_names())
+class _utcnow(FunctionElement):
+    """server_default для меток времени: текущее время в UTC.
 
+    Колонки DateTime без таймзоны, приложение пишет в них UTC. Голый now() в
+    Postgres отдал бы время в таймзоне сессии.
+    """
+    type = sa.DateTime()
+    inherit_cache = True
 
-def _index_exists(conn, table_name: str, index_name: str) -> bool:
-    insp = inspect(conn)
-    try:
-        for ix in insp.get_indexes(table_name):
-            if ix.get("name") == index_name:
-                return True
-    except Exception:
-        return False
-    return False
 
+@compiles(_utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(_utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(_utcnow, "mssql")
+def _utcnow_mssql(element, compiler, **kw):
+    return "GETUTCDATE()"
 
-def upgrade():
-    conn = op.get_bind()
 
-    if not _table_exists(conn, 'zone'):
-        op.create_table(
-            'zone',
-            sa.Column('id', sa.Integer(), primary_key=True),
+def _load_schema(conn) -> tuple[set[str], dict[str, set[str]]]:
+    """Снимок схемы за один проход инспектора.
+
+    Раньше каждая проверка создавала новый Inspector с пустым info_cache и
+    заново ходила в каталог (pg_class / sqlite_master) — десятки запросов.
+    Индексы читаются одним get_multi_indexes и только для таблиц этой
+    ревизии, а не для всего, что есть в базе.
+    """
+    insp = inspect(conn)
+    tables = set(insp.get_table_names())
+    ours = {t for t, *_ in INDEXES} | {t for t, *_ in PARTIAL_INDEXES}
+    indexes = {table: set() for table in tables}
+    if tables & ours:
+        multi = insp.get_multi_indexes(filter_names=sorted(tables & ours))
+        for (_schema, table), items in multi.items():
+            indexes[table] = {ix["name"] for ix in items if ix.get("name")}
+    return tables, indexes
+
+
+def _create_index(tables, indexes, name: str, table: str, columns: list[str], **kw) -> None:
+    if table in tables and name not in indexes.setdefault(table, set()):
+        op.create_index(name, table, columns, **kw)
+        indexes[table].add(name)
+
+
+# (table, index_name, columns).
+# Выборки по пользователю всегда идут "последние по времени" — для них
+# составные (user_id, ts|created_at): один проход по индексу вместо
+# пересечения двух. Одиночные индексы по времени оставлены для retention
+# и счётчиков, где фильтр только по времени.
+INDEXES: list[tuple[str, str, list[str]]] = [
+    ('pending_history', 'ix_pending_history_pending_id', ['pending_id']),
+    ('pending_history', 'ix_pending_history_address_id', ['address_id']),
+    ('chat_messages', 'ix_chat_messages_user_created', ['user_id', 'created_at']),
+    ('duty_shifts', 'ix_duty_shifts_started_at', ['started_at']),
+    ('duty_shifts', 'ix_duty_shifts_ended_at', ['ended_at']),
+    ('duty_events', 'ix_duty_events_user_ts', ['user_id', 'ts']),
+    ('duty_events', 'ix_duty_events_shift_id', ['shift_id']),
+    ('duty_events', 'ix_duty_events_ts', ['ts']),
+    ('duty_events', 'ix_duty_events_event_type', ['event_type']),
+    ('tracking_sessions', 'ix_tracking_sessions_user_id', ['user_id']),
+    ('tracking_sessions', 'ix_tracking_sessions_shift_id', ['shift_id']),
+    ('tracking_sessions', 'ix_tracking_sessions_started_at', ['started_at']),
+    ('tracking_sessions', 'ix_tracking_sessions_ended_at', ['ended_at']),
+    # (user_id, ts) для tracking_points строит и удаляет 0003.
+    ('tracking_points', 'ix_tracking_points_ts', ['ts']),
+    ('tracking_stops', 'ix_tracking_stops_session_id', ['session_id']),
+    ('tracking_stops', 'ix_tracking_stops_start_ts', ['start_ts']),
+    ('tracking_stops', 'ix_tracking_stops_end_ts', ['end_ts']),
+    ('break_requests', 'ix_break_requests_user_id', ['user_id']),
+    ('break_requests', 'ix_break_requests_shift_id', ['shift_id']),
+    ('break_requests', 'ix_break_requests_requested_at', ['requested_at']),
+    ('sos_alerts', 'ix_sos_alerts_user_created', ['user_id', 'created_at']),
+    ('sos_alerts', 'ix_sos_alerts_shift_id', ['shift_id']),
+    ('sos_alerts', 'ix_sos_alerts_session_id', ['session_id']),
+    ('sos_alerts', 'ix_sos_alerts_created_at', ['created_at']),
+    ('duty_notifications', 'ix_duty_notifications_user_created', ['user_id', 'created_at']),
+    ('duty_notifications', 'ix_duty_notifications_created_at', ['created_at']),
+    ('duty_notifications', 'ix_duty_notifications_kind', ['kind']),
+    ('tracker_pair_codes', 'ix_tracker_pair_codes_created_at', ['created_at']),
+    ('tracker_pair_codes', 'ix_tracker_pair_codes_expires_at', ['expires_at']),
+    ('tracker_devices', 'ix_tracker_devices_created_at', ['created_at']),
+    ('tracker_devices', 'ix_tracker_devices_last_seen_at', ['last_seen_at']),
+    ('tracker_devices', 'ix_tracker_devices_user_id', ['user_id']),
+    ('tracker_device_health', 'ix_tracker_device_health_user_id', ['user_id']),
+    ('tracker_device_health', 'ix_tracker_device_health_updated_at', ['updated_at']),
+    ('tracker_device_health_log', 'ix_tracker_device_health_log_user_ts', ['user_id', 'ts']),
+    ('tracker_device_health_log', 'ix_tracker_device_health_log_ts', ['ts']),
+    ('tracker_alerts', 'ix_tracker_alerts_user_id', ['user_id']),
+    ('tracker_alerts', 'ix_tracker_alerts_created_at', ['created_at']),
+    ('tracker_alerts', 'ix_tracker_alerts_updated_at', ['updated_at']),
+    ('tracker_admin_audit', 'ix_tracker_admin_audit_ts', ['ts']),
+]
+
+# (table, index_name, columns, where) — частичные индексы по "живым" строкам
+# вместо полного индекса по boolean/nullable колонке: запросы всегда ищут
+# меньшинство (неотозванные устройства, активные алерты, непрочитанные
+# уведомления), и индекс по всем строкам планировщик всё равно не берёт.
+# Без поддержки WHERE (MySQL) создаётся обычный индекс по columns.
+PARTIAL_INDEXES: list[tuple[str, str, list[str], str]] = [
+    ('tracking_sessions', 'ix_tracking_sessions_active', ['user_id'], 'is_active = true'),
+    ('duty_notifications', 'ix_duty_notifications_unacked', ['user_id', 'created_at'], 'acked = false'),
+    ('tracker_pair_codes', 'ix_tracker_pair_codes_unused', ['expires_at'], 'used_at IS NULL'),
+    ('tracker_devices', 'ix_tracker_devices_active', ['user_id'], 'is_revoked = false'),
+    ('tracker_alerts', 'ix_tracker_alerts_active', ['updated_at'], 'is_active = true'),
+]
+
+
+# Одиночные индексы по времени в append-only таблицах: строки лежат на диске
+# в порядке вставки, поэтому в Postgres хватает BRIN — килобайты вместо
+# B-tree на каждую точку. Нужны только для диапазонов (retention, счётчики);
+# выборки "последние N" идут по составным (user_id, ts). Остальные диалекты
+# BRIN не знают и строят обычный индекс.
+_BRIN_INDEXES = {
+    'ix_duty_events_ts',
+    'ix_tracking_points_ts',
+    'ix_tracker_device_health_log_ts',
+    'ix_tracker_admin_audit_ts',
+}
+_BRIN_KW = {'postgresql_using': 'brin', 'postgresql_with': {'pages_per_range': 32}}
+
+
+def _all_indexes() -> list[tuple[str, str, list[str], dict]]:
+    """INDEXES и PARTIAL_INDEXES в одном виде: (table, name, columns, kw для create_index)."""
+    result = [
+        (table, name, columns, dict(_BRIN_KW) if name in _BRIN_INDEXES else {})
+        for table, name, columns in INDEXES
+    ]
+    for table, name, columns, where in PARTIAL_INDEXES:
+        result.append((table, name, columns, {
+            'postgresql_where': sa.text(where),
+            'sqlite_where': sa.text(where),
+        }))
+    return result
+
+
+# PK самых "пишущих" таблиц: INT32 за несколько лет трекинга кончается.
+# В SQLite автоинкремент есть только у INTEGER PRIMARY KEY (alias rowid),
+# поэтому там остаётся Integer — он и так 64-битный.
+_BIG_ID = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+# Повторяющиеся колонки. Фабрики, а не общие объекты: Column привязывается
+# к одной таблице.
+def _id(type_=None) -> sa.Column:
+    return sa.Column('id', type_ if type_ is not None else sa.Integer(), primary_key=True)
+
+
+def _user_id(nullable: bool = False) -> sa.Column:
+    return sa.Column('user_id', sa.String(32), nullable=nullable)
+
+
+def _stamp(name: str, nullable: bool = True) -> sa.Column:
+    """Метка времени с серверным UTC-дефолтом (created_at / updated_at / ts ...)."""
+    return sa.Column(name, sa.DateTime(), nullable=nullable, server_default=_utcnow())
+
+
+def _shift_id() -> sa.Column:
+    return sa.Column('shift_id', sa.Integer(), sa.ForeignKey('duty_shifts.id'), nullable=True)
+
+
+def _latlon() -> tuple[sa.Column, sa.Column]:
+    return sa.Column('lat', sa.Float(), nullable=True), sa.Column('lon', sa.Float(), nullable=True)
+
+
+def _table_defs() -> list[tuple[str, list[sa.schema.SchemaItem]]]:
+    """Таблицы в порядке создания (родители раньше ссылающихся на них).
+
+    Колонки создаются заново на каждый вызов: Column привязывается к одной
+    таблице, а upgrade() может выполняться в процессе несколько раз.
+    """
+    return [
+        ('zone', [
+            _id(),
             sa.Column('description', sa.Text(), nullable=True),
             sa.Column('color', sa.String(32), nullable=False),
             sa.Column('icon', sa.String(64), nullable=True),
-            sa.Column('geometry', sa.Text(), nullable=False)
-        )
-
-    if not _table_exists(conn, 'admin_users'):
-        op.create_table(
-            'admin_users',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('geometry', sa.Text(), nullable=False),
+        ]),
+        ('admin_users', [
+            _id(),
             sa.Column('username', sa.String(64), nullable=False, unique=True),
             sa.Column('password_hash', sa.String(255), nullable=False),
             sa.Column('is_active', sa.Boolean(), nullable=False),
-            sa.Column('created_at', sa.DateTime(), nullable=False)
-        )
-
-    if not _table_exists(conn, 'addresses'):
-        op.create_table(
-            'addresses',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            _stamp('created_at', nullable=False),
+        ]),
+        ('addresses', [
+            _id(),
             sa.Column('name', sa.String(255), nullable=False),
-            sa.Column('lat', sa.Float(), nullable=True),
-            sa.Column('lon', sa.Float(), nullable=True),
+            *_latlon(),
             sa.Column('notes', sa.Text(), nullable=True),
             sa.Column('status', sa.String(64), nullable=True),
             sa.Column('link', sa.String(512), nullable=True),
             sa.Column('category', sa.String(128), nullable=True),
             sa.Column('zone_id', sa.Integer(), sa.ForeignKey('zone.id'), nullable=True),
             sa.Column('photo', sa.String(128), nullable=True),
-            sa.Column('created_at', sa.DateTime()),
-            sa.Column('updated_at', sa.DateTime())
-        )
-
-    if not _table_exists(conn, 'pending_markers'):
-        op.create_table(
-            'pending_markers',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            _stamp('created_at'),
+            _stamp('updated_at'),
+        ]),
+        ('pending_markers', [
+            _id(),
             sa.Column('name', sa.String(255), nullable=False),
-            sa.Column('lat', sa.Float(), nullable=True),
-            sa.Column('lon', sa.Float(), nullable=True),
+            *_latlon(),
             sa.Column('notes', sa.Text(), nullable=True),
             sa.Column('status', sa.String(64), nullable=True),
             sa.Column('link', sa.String(512), nullable=True),
@@ -91,192 +239,155 @@ def upgrade():
             sa.Column('user_id', sa.String(64), nullable=True),
             sa.Column('message_id', sa.String(64), nullable=True),
             sa.Column('reporter', sa.String(128), nullable=True),
-            sa.Column('created_at', sa.DateTime()),
-            sa.Column('updated_at', sa.DateTime())
-        )
-
-    if not _table_exists(conn, 'pending_history'):
-        op.create_table(
-            'pending_history',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            _stamp('created_at'),
+            _stamp('updated_at'),
+        ]),
+        ('pending_history', [
+            _id(),
+            # без FK: заявка удаляется после одобрения/отклонения, а история
+            # по ней должна остаться
             sa.Column('pending_id', sa.Integer(), nullable=False),
             sa.Column('status', sa.String(32), nullable=False),
-            sa.Column('timestamp', sa.DateTime()),
-            sa.Column('address_id', sa.Integer(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'chat_dialogs'):
-        op.create_table(
-            'chat_dialogs',
+            _stamp('timestamp'),
+            sa.Column('address_id', sa.Integer(), sa.ForeignKey('addresses.id', ondelete='SET NULL'), nullable=True),
+        ]),
+        ('chat_dialogs', [
             sa.Column('user_id', sa.String(64), primary_key=True),
             sa.Column('status', sa.String(16), nullable=False),
             sa.Column('unread_for_admin', sa.Integer(), nullable=False),
             sa.Column('unread_for_user', sa.Integer(), nullable=False),
-            sa.Column('last_message_at', sa.DateTime(), nullable=False),
+            _stamp('last_message_at', nullable=False),
             sa.Column('tg_username', sa.String(64), nullable=True),
             sa.Column('tg_first_name', sa.String(128), nullable=True),
             sa.Column('tg_last_name', sa.String(128), nullable=True),
             sa.Column('display_name', sa.String(256), nullable=True),
             sa.Column('last_notified_admin_msg_id', sa.Integer(), nullable=False),
-            sa.Column('last_seen_admin_msg_id', sa.Integer(), nullable=False)
-        )
-
-    if not _table_exists(conn, 'chat_messages'):
-        op.create_table(
-            'chat_messages',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(64), nullable=False),
+            sa.Column('last_seen_admin_msg_id', sa.Integer(), nullable=False),
+        ]),
+        ('chat_messages', [
+            _id(_BIG_ID),
+            sa.Column('user_id', sa.String(64), sa.ForeignKey('chat_dialogs.user_id', ondelete='CASCADE'), nullable=False),
             sa.Column('sender', sa.String(16), nullable=False),
             sa.Column('text', sa.Text(), nullable=False),
             sa.Column('is_read', sa.Boolean(), nullable=False),
-            sa.Column('created_at', sa.DateTime())
-        )
-
-    if not _table_exists(conn, 'duty_shifts'):
-        op.create_table(
-            'duty_shifts',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('started_at', sa.DateTime()),
+            _stamp('created_at'),
+        ]),
+        ('duty_shifts', [
+            _id(),
+            _stamp('started_at'),
             sa.Column('ended_at', sa.DateTime(), nullable=True),
             sa.Column('start_lat', sa.Float(), nullable=True),
             sa.Column('start_lon', sa.Float(), nullable=True),
             sa.Column('end_lat', sa.Float(), nullable=True),
-            sa.Column('end_lon', sa.Float(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'duty_events'):
-        op.create_table(
-            'duty_events',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('shift_id', sa.Integer(), sa.ForeignKey('duty_shifts.id'), nullable=True),
-            sa.Column('ts', sa.DateTime()),
+            sa.Column('end_lon', sa.Float(), nullable=True),
+        ]),
+        ('duty_events', [
+            _id(_BIG_ID),
+            _user_id(),
+            _shift_id(),
+            _stamp('ts'),
             sa.Column('event_type', sa.String(64), nullable=False),
-            sa.Column('payload_json', sa.Text(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracking_sessions'):
-        op.create_table(
-            'tracking_sessions',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('shift_id', sa.Integer(), sa.ForeignKey('duty_shifts.id'), nullable=True),
-            sa.Column('started_at', sa.DateTime()),
+            sa.Column('payload_json', sa.Text(), nullable=True),
+        ]),
+        ('tracking_sessions', [
+            _id(),
+            _user_id(),
+            _shift_id(),
+            _stamp('started_at'),
             sa.Column('ended_at', sa.DateTime(), nullable=True),
             sa.Column('is_active', sa.Boolean()),
             sa.Column('last_lat', sa.Float(), nullable=True),
             sa.Column('last_lon', sa.Float(), nullable=True),
             sa.Column('last_at', sa.DateTime(), nullable=True),
             sa.Column('snapshot_path', sa.String(255), nullable=True),
-            sa.Column('summary_json', sa.Text(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracking_points'):
-        op.create_table(
-            'tracking_points',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('summary_json', sa.Text(), nullable=True),
+        ]),
+        ('tracking_points', [
+            _id(_BIG_ID),
             sa.Column('session_id', sa.Integer(), sa.ForeignKey('tracking_sessions.id'), nullable=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('ts', sa.DateTime()),
-            sa.Column('lat', sa.Float(), nullable=True),
-            sa.Column('lon', sa.Float(), nullable=True),
+            _user_id(),
+            _stamp('ts'),
+            *_latlon(),
             sa.Column('accuracy_m', sa.Float(), nullable=True),
             sa.Column('raw_json', sa.Text(), nullable=True),
-            sa.UniqueConstraint('session_id', 'ts', 'kind', name='uq_tracking_points_session_ts_kind')
-        )
-
-    if not _table_exists(conn, 'tracking_stops'):
-        op.create_table(
-            'tracking_stops',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('kind', sa.String(16), nullable=False, server_default='live'),
+            # уникальный индекс (session_id, ts, kind) — он же основной путь
+            # выборки точек сессии по времени, отдельный индекс не нужен
+            sa.UniqueConstraint('session_id', 'ts', 'kind', name='uq_tracking_points_session_ts_kind'),
+        ]),
+        ('tracking_stops', [
+            _id(),
             sa.Column('session_id', sa.Integer(), sa.ForeignKey('tracking_sessions.id'), nullable=False),
             sa.Column('start_ts', sa.DateTime(), nullable=True),
             sa.Column('end_ts', sa.DateTime(), nullable=True),
             sa.Column('center_lat', sa.Float(), nullable=True),
             sa.Column('center_lon', sa.Float(), nullable=True),
             sa.Column('duration_sec', sa.Integer()),
-            sa.Column('radius_m', sa.Integer()),
-            sa.Column('points_count', sa.Integer())
-        )
-
-    if not _table_exists(conn, 'break_requests'):
-        op.create_table(
-            'break_requests',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('shift_id', sa.Integer(), sa.ForeignKey('duty_shifts.id'), nullable=True),
-            sa.Column('requested_at', sa.DateTime()),
-            sa.Column('duration_min', sa.Integer()),
+            sa.Column('radius_m', sa.SmallInteger()),
+            sa.Column('points_count', sa.Integer()),
+        ]),
+        ('break_requests', [
+            _id(),
+            _user_id(),
+            _shift_id(),
+            _stamp('requested_at'),
+            sa.Column('duration_min', sa.SmallInteger()),
             sa.Column('approved_by', sa.String(64), nullable=True),
             sa.Column('started_at', sa.DateTime(), nullable=True),
             sa.Column('ends_at', sa.DateTime(), nullable=True),
             sa.Column('ended_at', sa.DateTime(), nullable=True),
-            sa.Column('due_notified', sa.Boolean())
-        )
-
-    if not _table_exists(conn, 'sos_alerts'):
-        op.create_table(
-            'sos_alerts',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('shift_id', sa.Integer(), sa.ForeignKey('duty_shifts.id'), nullable=True),
+            sa.Column('due_notified', sa.Boolean()),
+        ]),
+        ('sos_alerts', [
+            _id(_BIG_ID),
+            _user_id(),
+            _shift_id(),
             sa.Column('session_id', sa.Integer(), sa.ForeignKey('tracking_sessions.id'), nullable=True),
             sa.Column('unit_label', sa.String(64), nullable=True),
-            sa.Column('created_at', sa.DateTime()),
-            sa.Column('lat', sa.Float(), nullable=True),
-            sa.Column('lon', sa.Float(), nullable=True),
+            _stamp('created_at'),
+            *_latlon(),
             sa.Column('accuracy_m', sa.Float(), nullable=True),
             sa.Column('note', sa.String(256), nullable=True),
             sa.Column('acked_at', sa.DateTime(), nullable=True),
             sa.Column('acked_by', sa.String(64), nullable=True),
             sa.Column('closed_at', sa.DateTime(), nullable=True),
-            sa.Column('closed_by', sa.String(64), nullable=True)
-        )
-
-    if not _table_exists(conn, 'duty_notifications'):
-        op.create_table(
-            'duty_notifications',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('created_at', sa.DateTime()),
+            sa.Column('closed_by', sa.String(64), nullable=True),
+        ]),
+        ('duty_notifications', [
+            _id(),
+            _user_id(),
+            _stamp('created_at'),
             sa.Column('kind', sa.String(32), nullable=False),
             sa.Column('text', sa.String(4096), nullable=False),
             sa.Column('payload_json', sa.Text(), nullable=True),
             sa.Column('acked', sa.Boolean()),
-            sa.Column('acked_at', sa.DateTime(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracker_pair_codes'):
-        op.create_table(
-            'tracker_pair_codes',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('acked_at', sa.DateTime(), nullable=True),
+        ]),
+        ('tracker_pair_codes', [
+            _id(),
             sa.Column('code_hash', sa.String(64), nullable=False, unique=True),
-            sa.Column('created_at', sa.DateTime()),
+            _stamp('created_at'),
             sa.Column('expires_at', sa.DateTime(), nullable=False),
             sa.Column('used_at', sa.DateTime(), nullable=True),
-            sa.Column('label', sa.String(128), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracker_devices'):
-        op.create_table(
-            'tracker_devices',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('label', sa.String(128), nullable=True),
+        ]),
+        ('tracker_devices', [
+            _id(),
             sa.Column('public_id', sa.String(32), nullable=False, unique=True),
-            sa.Column('created_at', sa.DateTime()),
+            _stamp('created_at'),
             sa.Column('last_seen_at', sa.DateTime(), nullable=True),
             sa.Column('token_hash', sa.String(64), nullable=False, unique=True),
             sa.Column('is_revoked', sa.Boolean()),
             sa.Column('label', sa.String(128), nullable=True),
             sa.Column('profile_json', sa.Text(), nullable=True),
-            sa.Column('user_id', sa.String(32), nullable=False)
-        )
-
-    if not _table_exists(conn, 'tracker_device_health'):
-        op.create_table(
-            'tracker_device_health',
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('updated_at', sa.DateTime()),
-            sa.Column('battery_pct', sa.Integer(), nullable=True),
+            _user_id(),
+        ]),
+        ('tracker_device_health', [
+            # одна строка на устройство: upsert ON CONFLICT (device_id)
+            sa.Column('device_id', sa.String(32), primary_key=True),
+            _user_id(),
+            _stamp('updated_at'),
+            sa.Column('battery_pct', sa.SmallInteger(), nullable=True),
             sa.Column('is_charging', sa.Boolean(), nullable=True),
             sa.Column('accuracy_m', sa.Float(), nullable=True),
             sa.Column('queue_size', sa.Integer(), nullable=True),
@@ -286,16 +397,13 @@ def upgrade():
             sa.Column('app_version', sa.String(32), nullable=True),
             sa.Column('device_model', sa.String(64), nullable=True),
             sa.Column('os_version', sa.String(32), nullable=True),
-            sa.Column('extra_json', sa.Text(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracker_device_health_log'):
-        op.create_table(
-            'tracker_device_health_log',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=False),
-            sa.Column('ts', sa.DateTime()),
-            sa.Column('battery_pct', sa.Integer(), nullable=True),
+            sa.Column('extra_json', sa.Text(), nullable=True),
+        ]),
+        ('tracker_device_health_log', [
+            _id(_BIG_ID),
+            _user_id(),
+            _stamp('ts'),
+            sa.Column('battery_pct', sa.SmallInteger(), nullable=True),
             sa.Column('is_charging', sa.Boolean(), nullable=True),
             sa.Column('net', sa.String(16), nullable=True),
             sa.Column('gps', sa.String(16), nullable=True),
@@ -307,200 +415,159 @@ def upgrade():
             sa.Column('app_version', sa.String(32), nullable=True),
             sa.Column('device_model', sa.String(64), nullable=True),
             sa.Column('os_version', sa.String(32), nullable=True),
-            sa.Column('extra_json', sa.Text(), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracker_alerts'):
-        op.create_table(
-            'tracker_alerts',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('user_id', sa.String(32), nullable=True),
+            sa.Column('extra_json', sa.Text(), nullable=True),
+        ]),
+        ('tracker_alerts', [
+            _id(),
+            _user_id(nullable=True),
             sa.Column('message', sa.String(256), nullable=True),
             sa.Column('payload_json', sa.Text(), nullable=True),
-            sa.Column('created_at', sa.DateTime()),
-            sa.Column('updated_at', sa.DateTime()),
+            _stamp('created_at'),
+            _stamp('updated_at'),
             sa.Column('is_active', sa.Boolean()),
             sa.Column('acked_at', sa.DateTime(), nullable=True),
             sa.Column('acked_by', sa.String(64), nullable=True),
             sa.Column('closed_at', sa.DateTime(), nullable=True),
-            sa.Column('closed_by', sa.String(64), nullable=True)
-        )
-
-    if not _table_exists(conn, 'tracker_admin_audit'):
-        op.create_table(
-            'tracker_admin_audit',
-            sa.Column('id', sa.Integer(), primary_key=True),
-            sa.Column('ts', sa.DateTime()),
+            sa.Column('closed_by', sa.String(64), nullable=True),
+        ]),
+        ('tracker_admin_audit', [
+            _id(),
+            _stamp('ts'),
             sa.Column('actor', sa.String(64)),
             sa.Column('device_id', sa.String(32), nullable=True),
-            sa.Column('user_id', sa.String(32), nullable=True),
-            sa.Column('payload_json', sa.Text(), nullable=True)
-        )
-
-
-    # single-column indexes (from models index=True)
-    if _table_exists(conn, 'duty_shifts') and not _index_exists(conn, 'duty_shifts', 'ix_duty_shifts_started_at'):
-        op.create_index('ix_duty_shifts_started_at', 'duty_shifts', ['started_at'])
-    if _table_exists(conn, 'duty_shifts') and not _index_exists(conn, 'duty_shifts', 'ix_duty_shifts_ended_at'):
-        op.create_index('ix_duty_shifts_ended_at', 'duty_shifts', ['ended_at'])
-    if _table_exists(conn, 'duty_events') and not _index_exists(conn, 'duty_events', 'ix_duty_events_user_id'):
-        op.create_index('ix_duty_events_user_id', 'duty_events', ['user_id'])
-    if _table_exists(conn, 'duty_events') and not _index_exists(conn, 'duty_events', 'ix_duty_events_shift_id'):
-        op.create_index('ix_duty_events_shift_id', 'duty_events', ['shift_id'])
-    if _table_exists(conn, 'duty_events') and not _index_exists(conn, 'duty_events', 'ix_duty_events_ts'):
-        op.create_index('ix_duty_events_ts', 'duty_events', ['ts'])
-    if _table_exists(conn, 'duty_events') and not _index_exists(conn, 'duty_events', 'ix_duty_events_event_type'):
-        op.create_index('ix_duty_events_event_type', 'duty_events', ['event_type'])
-    if _table_exists(conn, 'tracking_sessions') and not _index_exists(conn, 'tracking_sessions', 'ix_tracking_sessions_user_id'):
-        op.create_index('ix_tracking_sessions_user_id', 'tracking_sessions', ['user_id'])
-    if _table_exists(conn, 'tracking_sessions') and not _index_exists(conn, 'tracking_sessions', 'ix_tracking_sessions_shift_id'):
-        op.create_index('ix_tracking_sessions_shift_id', 'tracking_sessions', ['shift_id'])
-    if _table_exists(conn, 'tracking_sessions') and not _index_exists(conn, 'tracking_sessions', 'ix_tracking_sessions_started_at'):
-        op.create_index('ix_tracking_sessions_started_at', 'tracking_sessions', ['started_at'])
-    if _table_exists(conn, 'tracking_sessions') and not _index_exists(conn, 'tracking_sessions', 'ix_tracking_sessions_ended_at'):
-        op.create_index('ix_tracking_sessions_ended_at', 'tracking_sessions', ['ended_at'])
-    if _table_exists(conn, 'tracking_points') and not _index_exists(conn, 'tracking_points', 'ix_tracking_points_session_id'):
-        op.create_index('ix_tracking_points_session_id', 'tracking_points', ['session_id'])
-    if _table_exists(conn, 'tracking_points') and not _index_exists(conn, 'tracking_points', 'ix_tracking_points_user_id'):
-        op.create_index('ix_tracking_points_user_id', 'tracking_points', ['user_id'])
-    if _table_exists(conn, 'tracking_points') and not _index_exists(conn, 'tracking_points', 'ix_tracking_points_ts'):
-        op.create_index('ix_tracking_points_ts', 'tracking_points', ['ts'])
-    if _table_exists(conn, 'tracking_stops') and not _index_exists(conn, 'tracking_stops', 'ix_tracking_stops_session_id'):
-        op.create_index('ix_tracking_stops_session_id', 'tracking_stops', ['session_id'])
-    if _table_exists(conn, 'tracking_stops') and not _index_exists(conn, 'tracking_stops', 'ix_tracking_stops_start_ts'):
-        op.create_index('ix_tracking_stops_start_ts', 'tracking_stops', ['start_ts'])
-    if _table_exists(conn, 'tracking_stops') and not _index_exists(conn, 'tracking_stops', 'ix_tracking_stops_end_ts'):
-        op.create_index('ix_tracking_stops_end_ts', 'tracking_stops', ['end_ts'])
-    if _table_exists(conn, 'break_requests') and not _index_exists(conn, 'break_requests', 'ix_break_requests_user_id'):
-        op.create_index('ix_break_requests_user_id', 'break_requests', ['user_id'])
-    if _table_exists(conn, 'break_requests') and not _index_exists(conn, 'break_requests', 'ix_break_requests_shift_id'):
-        op.create_index('ix_break_requests_shift_id', 'break_requests', ['shift_id'])
-    if _table_exists(conn, 'break_requests') and not _index_exists(conn, 'break_requests', 'ix_break_requests_requested_at'):
-        op.create_index('ix_break_requests_requested_at', 'break_requests', ['requested_at'])
-    if _table_exists(conn, 'sos_alerts') and not _index_exists(conn, 'sos_alerts', 'ix_sos_alerts_user_id'):
-        op.create_index('ix_sos_alerts_user_id', 'sos_alerts', ['user_id'])
-    if _table_exists(conn, 'sos_alerts') and not _index_exists(conn, 'sos_alerts', 'ix_sos_alerts_shift_id'):
-        op.create_index('ix_sos_alerts_shift_id', 'sos_alerts', ['shift_id'])
-    if _table_exists(conn, 'sos_alerts') and not _index_exists(conn, 'sos_alerts', 'ix_sos_alerts_session_id'):
-        op.create_index('ix_sos_alerts_session_id', 'sos_alerts', ['session_id'])
-    if _table_exists(conn, 'sos_alerts') and not _index_exists(conn, 'sos_alerts', 'ix_sos_alerts_created_at'):
-        op.create_index('ix_sos_alerts_created_at', 'sos_alerts', ['created_at'])
-    if _table_exists(conn, 'duty_notifications') and not _index_exists(conn, 'duty_notifications', 'ix_duty_notifications_user_id'):
-        op.create_index('ix_duty_notifications_user_id', 'duty_notifications', ['user_id'])
-    if _table_exists(conn, 'duty_notifications') and not _index_exists(conn, 'duty_notifications', 'ix_duty_notifications_created_at'):
-        op.create_index('ix_duty_notifications_created_at', 'duty_notifications', ['created_at'])
-    if _table_exists(conn, 'duty_notifications') and not _index_exists(conn, 'duty_notifications', 'ix_duty_notifications_kind'):
-        op.create_index('ix_duty_notifications_kind', 'duty_notifications', ['kind'])
-    if _table_exists(conn, 'duty_notifications') and not _index_exists(conn, 'duty_notifications', 'ix_duty_notifications_acked'):
-        op.create_index('ix_duty_notifications_acked', 'duty_notifications', ['acked'])
-    if _table_exists(conn, 'tracker_pair_codes') and not _index_exists(conn, 'tracker_pair_codes', 'ix_tracker_pair_codes_created_at'):
-        op.create_index('ix_tracker_pair_codes_created_at', 'tracker_pair_codes', ['created_at'])
-    if _table_exists(conn, 'tracker_pair_codes') and not _index_exists(conn, 'tracker_pair_codes', 'ix_tracker_pair_codes_expires_at'):
-        op.create_index('ix_tracker_pair_codes_expires_at', 'tracker_pair_codes', ['expires_at'])
-    if _table_exists(conn, 'tracker_pair_codes') and not _index_exists(conn, 'tracker_pair_codes', 'ix_tracker_pair_codes_used_at'):
-        op.create_index('ix_tracker_pair_codes_used_at', 'tracker_pair_codes', ['used_at'])
-    if _table_exists(conn, 'tracker_devices') and not _index_exists(conn, 'tracker_devices', 'ix_tracker_devices_created_at'):
-        op.create_index('ix_tracker_devices_created_at', 'tracker_devices', ['created_at'])
-    if _table_exists(conn, 'tracker_devices') and not _index_exists(conn, 'tracker_devices', 'ix_tracker_devices_last_seen_at'):
-        op.create_index('ix_tracker_devices_last_seen_at', 'tracker_devices', ['last_seen_at'])
-    if _table_exists(conn, 'tracker_devices') and not _index_exists(conn, 'tracker_devices', 'ix_tracker_devices_is_revoked'):
-        op.create_index('ix_tracker_devices_is_revoked', 'tracker_devices', ['is_revoked'])
-    if _table_exists(conn, 'tracker_devices') and not _index_exists(conn, 'tracker_devices', 'ix_tracker_devices_user_id'):
-        op.create_index('ix_tracker_devices_user_id', 'tracker_devices', ['user_id'])
-    if _table_exists(conn, 'tracker_device_health') and not _index_exists(conn, 'tracker_device_health', 'ix_tracker_device_health_user_id'):
-        op.create_index('ix_tracker_device_health_user_id', 'tracker_device_health', ['user_id'])
-    if _table_exists(conn, 'tracker_device_health') and not _index_exists(conn, 'tracker_device_health', 'ix_tracker_device_health_updated_at'):
-        op.create_index('ix_tracker_device_health_updated_at', 'tracker_device_health', ['updated_at'])
-    if _table_exists(conn, 'tracker_device_health_log') and not _index_exists(conn, 'tracker_device_health_log', 'ix_tracker_device_health_log_user_id'):
-        op.create_index('ix_tracker_device_health_log_user_id', 'tracker_device_health_log', ['user_id'])
-    if _table_exists(conn, 'tracker_device_health_log') and not _index_exists(conn, 'tracker_device_health_log', 'ix_tracker_device_health_log_ts'):
-        op.create_index('ix_tracker_device_health_log_ts', 'tracker_device_health_log', ['ts'])
-    if _table_exists(conn, 'tracker_alerts') and not _index_exists(conn, 'tracker_alerts', 'ix_tracker_alerts_user_id'):
-        op.create_index('ix_tracker_alerts_user_id', 'tracker_alerts', ['user_id'])
-    if _table_exists(conn, 'tracker_alerts') and not _index_exists(conn, 'tracker_alerts', 'ix_tracker_alerts_created_at'):
-        op.create_index('ix_tracker_alerts_created_at', 'tracker_alerts', ['created_at'])
-    if _table_exists(conn, 'tracker_alerts') and not _index_exists(conn, 'tracker_alerts', 'ix_tracker_alerts_updated_at'):
-        op.create_index('ix_tracker_alerts_updated_at', 'tracker_alerts', ['updated_at'])
-    if _table_exists(conn, 'tracker_alerts') and not _index_exists(conn, 'tracker_alerts', 'ix_tracker_alerts_is_active'):
-        op.create_index('ix_tracker_alerts_is_active', 'tracker_alerts', ['is_active'])
-    if _table_exists(conn, 'tracker_admin_audit') and not _index_exists(conn, 'tracker_admin_audit', 'ix_tracker_admin_audit_ts'):
-        op.create_index('ix_tracker_admin_audit_ts', 'tracker_admin_audit', ['ts'])
+            _user_id(nullable=True),
+            sa.Column('payload_json', sa.Text(), nullable=True),
+        ]),
+    ]
+
+
+def _build_metadata(deferrable_fks: bool = False) -> sa.MetaData:
+    # Все таблицы в одной MetaData, чтобы FK на уже существующие таблицы
+    # резолвились при компиляции DDL.
+    metadata = sa.MetaData()
+    for name, items in _table_defs():
+        sa.Table(name, metadata, *items)
+    if deferrable_fks:
+        # DEFERRABLE INITIALLY IMMEDIATE: для приложения проверка по-прежнему
+        # на каждом statement'е, а массовая загрузка связанных строк (будущие
+        # data-миграции) может сделать SET CONSTRAINTS ALL DEFERRED и
+        # проверить FK один раз на COMMIT. MySQL/MSSQL такого не знают.
+        for table in metadata.tables.values():
+            for fk in table.foreign_key_constraints:
+                fk.deferrable, fk.initially = True, "IMMEDIATE"
+    return metadata
+
+
+# Диалекты с CREATE/DROP ... IF [NOT] EXISTS и для таблиц, и для индексов:
+# существование проверяет сам сервер, каталог заранее не опрашиваем.
+_IF_EXISTS_DIALECTS = ("postgresql", "sqlite")
+
+
+def _ddl_statements() -> tuple[list[CreateTable], list[CreateIndex]]:
+    """CREATE TABLE / CREATE INDEX ... IF NOT EXISTS в порядке создания."""
+    metadata = _build_metadata(deferrable_fks=True)
+    tables = [CreateTable(t, if_not_exists=True) for t in metadata.tables.values()]
+    indexes = []
+    for table, name, columns, kw in _all_indexes():
+        t = metadata.tables[table]
+        index = sa.Index(name, *(t.c[c] for c in columns), postgresql_concurrently=True, **kw)
+        indexes.append(CreateIndex(index, if_not_exists=True))
+    return tables, indexes
+
+
+def _compiled_ddl(dialect) -> tuple[list[str], list[str]]:
+    # Ревизия выполняется на базе один раз — компилируем прямо при вызове.
+    tables, indexes = _ddl_statements()
+    return (
+        [str(stmt.compile(dialect=dialect)).strip() for stmt in tables],
+        [str(stmt.compile(dialect=dialect)).strip() for stmt in indexes],
+    )
+
+
+def _upgrade_if_not_exists(conn) -> None:
+    """Postgres/SQLite: готовые строки DDL прямо в драйвер.
+
+    Postgres: таблицы одной строкой — один round-trip (psycopg2 принимает
+    несколько statement'ов; транзакцию держит alembic,
+    transaction_per_migration). CREATE INDEX CONCURRENTLY внутри транзакции
+    запрещён, поэтому индексы строятся после COMMIT таблиц в
+    autocommit_block, по одному statement'у: при повторном прогоне на живой
+    базе не берётся SHARE-лок, блокирующий вставки в tracking_points.
+    sqlite3 выполняет только один statement за вызов — по одному.
+    """
+    ctx = op.get_context()
+    postgres = conn.dialect.name == "postgresql"
+
+    if ctx.as_sql:
+        # --sql: соединения нет, пишем в скрипт конструкции по одной
+        tables, indexes = _ddl_statements()
+        run = op.execute
+    else:
+        tables, indexes = _compiled_ddl(conn.dialect)
+        run = conn.exec_driver_sql
+        if postgres:
+            tables = [";\n".join(tables)]
+
+    for stmt in tables:
+        run(stmt)
+
+    if postgres:
+        with ctx.autocommit_block():
+            for stmt in indexes:
+                run(stmt)
+    else:
+        for stmt in indexes:
+            run(stmt)
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    if conn.dialect.name in _IF_EXISTS_DIALECTS:
+        _upgrade_if_not_exists(conn)
+        return
+
+    # Прочие диалекты (MySQL/MSSQL): IF NOT EXISTS для индексов нет —
+    # проверяем по снимку схемы.
+    tables, indexes = _load_schema(conn)
+
+    metadata = _build_metadata()
+    if not tables & set(metadata.tables):
+        # Чистая база (обычная установка): create_all сам упорядочит таблицы
+        # по FK и создаст индексы следом, без проверок по одному объекту.
+        for table, name, columns, kw in _all_indexes():
+            t = metadata.tables[table]
+            sa.Index(name, *(t.c[c] for c in columns), **kw)
+        metadata.create_all(conn, checkfirst=False)
+        return
+
+    # Часть таблиц уже есть — досоздаём недостающее.
+    for name, columns in _table_defs():
+        if name not in tables:
+            op.create_table(name, *columns)
+            tables.add(name)
+
+    for table, name, columns, kw in _all_indexes():
+        _create_index(tables, indexes, name, table, columns, **kw)
 
 
 def downgrade():
     conn = op.get_bind()
-    # drop indexes first
-    for table_name, index_name in [
-        ('duty_shifts', 'ix_duty_shifts_started_at'),
-        ('duty_shifts', 'ix_duty_shifts_ended_at'),
-        ('duty_events', 'ix_duty_events_user_id'),
-        ('duty_events', 'ix_duty_events_shift_id'),
-        ('duty_events', 'ix_duty_events_ts'),
-        ('duty_events', 'ix_duty_events_event_type'),
-        ('tracking_sessions', 'ix_tracking_sessions_user_id'),
-        ('tracking_sessions', 'ix_tracking_sessions_shift_id'),
-        ('tracking_sessions', 'ix_tracking_sessions_started_at'),
-        ('tracking_sessions', 'ix_tracking_sessions_ended_at'),
-        ('tracking_points', 'ix_tracking_points_session_id'),
-        ('tracking_points', 'ix_tracking_points_user_id'),
-        ('tracking_points', 'ix_tracking_points_ts'),
-        ('tracking_stops', 'ix_tracking_stops_session_id'),
-        ('tracking_stops', 'ix_tracking_stops_start_ts'),
-        ('tracking_stops', 'ix_tracking_stops_end_ts'),
-        ('break_requests', 'ix_break_requests_user_id'),
-        ('break_requests', 'ix_break_requests_shift_id'),
-        ('break_requests', 'ix_break_requests_requested_at'),
-        ('sos_alerts', 'ix_sos_alerts_user_id'),
-        ('sos_alerts', 'ix_sos_alerts_shift_id'),
-        ('sos_alerts', 'ix_sos_alerts_session_id'),
-        ('sos_alerts', 'ix_sos_alerts_created_at'),
-        ('duty_notifications', 'ix_duty_notifications_user_id'),
-        ('duty_notifications', 'ix_duty_notifications_created_at'),
-        ('duty_notifications', 'ix_duty_notifications_kind'),
-        ('duty_notifications', 'ix_duty_notifications_acked'),
-        ('tracker_pair_codes', 'ix_tracker_pair_codes_created_at'),
-        ('tracker_pair_codes', 'ix_tracker_pair_codes_expires_at'),
-        ('tracker_pair_codes', 'ix_tracker_pair_codes_used_at'),
-        ('tracker_devices', 'ix_tracker_devices_created_at'),
-        ('tracker_devices', 'ix_tracker_devices_last_seen_at'),
-        ('tracker_devices', 'ix_tracker_devices_is_revoked'),
-        ('tracker_devices', 'ix_tracker_devices_user_id'),
-        ('tracker_device_health', 'ix_tracker_device_health_user_id'),
-        ('tracker_device_health', 'ix_tracker_device_health_updated_at'),
-        ('tracker_device_health_log', 'ix_tracker_device_health_log_user_id'),
-        ('tracker_device_health_log', 'ix_tracker_device_health_log_ts'),
-        ('tracker_alerts', 'ix_tracker_alerts_user_id'),
-        ('tracker_alerts', 'ix_tracker_alerts_created_at'),
-        ('tracker_alerts', 'ix_tracker_alerts_updated_at'),
-        ('tracker_alerts', 'ix_tracker_alerts_is_active'),
-        ('tracker_admin_audit', 'ix_tracker_admin_audit_ts'),
-    ]:
-        if _table_exists(conn, table_name) and _index_exists(conn, table_name, index_name):
-            op.drop_index(index_name, table_name=table_name)
-
-    # drop tables in reverse dependency order
-    for table_name in [
-        'tracker_admin_audit',
-        'tracker_alerts',
-        'tracker_device_health_log',
-        'tracker_device_health',
-        'tracker_devices',
-        'tracker_pair_codes',
-        'duty_notifications',
-        'sos_alerts',
-        'break_requests',
-        'tracking_stops',
-        'tracking_points',
-        'tracking_sessions',
-        'duty_events',
-        'duty_shifts',
-        'chat_messages',
-        'chat_dialogs',
-        'pending_history',
-        'pending_markers',
-        'addresses',
-        'admin_users',
-        'zone',
-    ]:
-        if _table_exists(conn, table_name):
-            op.drop_table(table_name)
+    # Индексы уходят вместе с таблицами — отдельные DROP INDEX не нужны.
+    names = [name for name, _columns in reversed(_table_defs())]
+
+    if conn.dialect.name == "postgresql":
+        # одним statement'ом; CASCADE снимает FK от таблиц вне этой ревизии
+        op.execute(f"DROP TABLE IF EXISTS {', '.join(names)} CASCADE")
+        return
+
+    if conn.dialect.name in _IF_EXISTS_DIALECTS:
+        for name in names:
+            op.drop_table(name, if_exists=True)
+        return
+
+    tables = set(inspect(conn).get_table_names())
+    # таблицы — в обратном порядке зависимостей
+    for name in names:
+        if name in tables:
+            op.drop_table(name)
@@ -7,9 +7,11 @@ Create Date: 2025-12-24
 
 from __future__ import annotations
 
+import os
+
 from alembic import op
+from alembic.util import load_python_file
 import sqlalchemy as sa
-from sqlalchemy import inspect
 
 
 # revision identifiers, used by Alembic.
@@ -18,30 +20,21 @@ down_revision = "0001_init"
 branch_labels = None
 depends_on = None
 
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
 
-def _table_exists(conn, table_name: str) -> bool:
-    insp = inspect(conn)
-    return table_name in set(insp.get_table_names())
-
-
-def _index_exists(conn, table_name: str, index_name: str) -> bool:
-    insp = inspect(conn)
-    try:
-        for ix in insp.get_indexes(table_name):
-            if ix.get("name") == index_name:
-                return True
-    except Exception:
-        return False
-    return False
+# PK пишущих логов сразу BIGINT, как _BIG_ID в 0001: смена типа потом
+# переписывает всю таблицу. В SQLite автоинкремент только у INTEGER PK.
+_BIG_ID = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
 
 
 def upgrade():
-    conn = op.get_bind()
+    insp = Introspect(op.get_bind())
 
-    if not _table_exists(conn, "admin_audit_log"):
+    if insp.should_create_table("admin_audit_log"):
         op.create_table(
             'admin_audit_log',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('id', _BIG_ID, primary_key=True),
             sa.Column('ts', sa.DateTime()),
             sa.Column('actor', sa.String(64), nullable=True),
             sa.Column('role', sa.String(16), nullable=True),
@@ -49,16 +42,17 @@ def upgrade():
             sa.Column('method', sa.String(8), nullable=True),
             sa.Column('path', sa.String(255), nullable=True),
             sa.Column('action', sa.String(64), nullable=False),
-            sa.Column('payload_json', sa.Text(), nullable=True)
+            sa.Column('payload_json', sa.Text(), nullable=True),
+            if_not_exists=insp.if_not_exists,
         )
+        insp.add_table("admin_audit_log")
 
-    if _table_exists(conn, "admin_audit_log") and not _index_exists(conn, "admin_audit_log", "ix_admin_audit_log_ts"):
-        op.create_index("ix_admin_audit_log_ts", "admin_audit_log", ["ts"])
+    if insp.should_create_index("admin_audit_log", "ix_admin_audit_log_ts"):
+        op.create_index("ix_admin_audit_log_ts", "admin_audit_log", ["ts"], if_not_exists=insp.if_not_exists)
 
 
 def downgrade():
-    conn = op.get_bind()
-    if _table_exists(conn, "admin_audit_log") and _index_exists(conn, "admin_audit_log", "ix_admin_audit_log_ts"):
-        op.drop_index("ix_admin_audit_log_ts", table_name="admin_audit_log")
-    if _table_exists(conn, "admin_audit_log"):
-        op.drop_table("admin_audit_log")
+    insp = Introspect(op.get_bind())
+    # Индекс уходит вместе с таблицей.
+    if insp.should_drop_table("admin_audit_log"):
+        op.drop_table("admin_audit_log", if_exists=insp.if_exists)
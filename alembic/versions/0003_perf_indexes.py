@@ -8,78 +8,106 @@ Create Date: 2025-12-24
 from __future__ import annotations
 
 import os
-import sys
 
 from alembic import op
-from sqlalchemy import inspect
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from alembic.util import load_python_file
+import sqlalchemy as sa
 
 revision = "0003_perf_indexes"
 down_revision = "0002_admin_audit"
 branch_labels = None
 depends_on = None
 
-
-def _table_exists(conn, name: str) -> bool:
-    try:
-        return name in inspect(conn).get_table_names()
-    except Exception:
-        return False
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
 
 
-def _index_exists(conn, table: str, index_name: str) -> bool:
-    try:
-        for ix in inspect(conn).get_indexes(table):
-            if ix.get("name") == index_name:
-                return True
-    except Exception:
-        return False
-    return False
+# (таблица, индекс, колонки)
+_INDEXES = (
+    # chat_messages: ускорение счётчиков непрочитанного и выборок
+    ("chat_messages", "ix_chat_messages_user_sender_isread", ["user_id", "sender", "is_read", "created_at"]),
+    # tracking_points: таймлайн по user_id. Таймлайн по сессии обслуживает
+    # uq_tracking_points_session_ts_kind (session_id, ts, kind) из 0001.
+    ("tracking_points", "ix_tracking_points_user_ts", ["user_id", "ts"]),
+    # duty_events: ускорение выборок по смене
+    ("duty_events", "ix_duty_events_shift_ts", ["shift_id", "ts"]),
+)
+
+# Раньше 0003 строила и ix_tracking_points_session_ts — префикс
+# uq_tracking_points_session_ts_kind. Новым базам он не нужен; в старых
+# downgrade удаляет его вместе с остальными индексами ревизии.
+_LEGACY_INDEXES = (
+    ("tracking_points", "ix_tracking_points_session_ts"),
+)
+
+# PostgreSQL: счётчики непрочитанного (count(id) по user_id/sender при
+# is_read = false) обслуживает частичный покрывающий индекс — index-only
+# scan без чтения таблицы. is_read в ключе не нужен: он задан условием.
+_PG_OVERRIDES = {
+    "ix_chat_messages_user_sender_isread": (
+        ["user_id", "sender"],
+        {"postgresql_include": ["id", "created_at"], "postgresql_where": sa.text("is_read = false")},
+    ),
+}
+
+# Сессионные настройки PostgreSQL на время построения индексов. Число
+# воркеров ограничено сверху max_parallel_workers сервера.
+_PG_BUILD_SETTINGS = (
+    ("max_parallel_maintenance_workers", "4"),
+    ("maintenance_work_mem", "'256MB'"),
+)
 
 
 def upgrade():
     conn = op.get_bind()
-
-    # chat_messages: ускорение счётчиков непрочитанного и выборок
-    if _table_exists(conn, "chat_messages") and not _index_exists(conn, "chat_messages", "ix_chat_messages_user_sender_isread"):
-        op.create_index(
-            "ix_chat_messages_user_sender_isread",
-            "chat_messages",
-            ["user_id", "sender", "is_read", "created_at"],
-        )
-
-    # tracking_points: ускорение таймлайна по сессии и по user_id
-    if _table_exists(conn, "tracking_points") and not _index_exists(conn, "tracking_points", "ix_tracking_points_session_ts"):
-        op.create_index(
-            "ix_tracking_points_session_ts",
-            "tracking_points",
-            ["session_id", "ts"],
-        )
-    if _table_exists(conn, "tracking_points") and not _index_exists(conn, "tracking_points", "ix_tracking_points_user_ts"):
-        op.create_index(
-            "ix_tracking_points_user_ts",
-            "tracking_points",
-            ["user_id", "ts"],
-        )
-
-    # duty_events: ускорение выборок по смене
-    if _table_exists(conn, "duty_events") and not _index_exists(conn, "duty_events", "ix_duty_events_shift_ts"):
-        op.create_index(
-            "ix_duty_events_shift_ts",
-            "duty_events",
-            ["shift_id", "ts"],
-        )
+    insp = Introspect(conn)
+    missing = [
+        (table, name, columns)
+        for table, name, columns in _INDEXES
+        if insp.has_table(table) and not insp.has_index(table, name)
+    ]
+
+    if conn.dialect.name == "postgresql":
+        # CONCURRENTLY не держит блокировку записи на время построения,
+        # но не работает внутри транзакции.
+        with op.get_context().autocommit_block():
+            # Параллелим внутри одного построения (PG 11+: воркеры сканируют
+            # таблицу и сортируют вместе), а не разными соединениями:
+            # CONCURRENTLY-построения ждут снимков друг друга. Сессионные
+            # настройки возвращаем — соединение env.py живёт дальше.
+            for setting, value in _PG_BUILD_SETTINGS:
+                op.execute(f"SET {setting} = {value}")
+            try:
+                for table, name, columns in missing:
+                    columns, kw = _PG_OVERRIDES.get(name, (columns, {}))
+                    op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+            finally:
+                for setting, _value in _PG_BUILD_SETTINGS:
+                    op.execute(f"RESET {setting}")
+            analyze = list(dict.fromkeys(table for table, _name, _columns in missing))
+            if os.environ.get("ALEMBIC_CLUSTER_TRACKING") and insp.has_table("tracking_points"):
+                # Разовая перекладка точек по (session_id, ts): таймлайн сессии
+                # читается подряд. CLUSTER держит ACCESS EXCLUSIVE на всё время
+                # перезаписи и ломает порядок вставки, на который опирается
+                # BRIN ix_tracking_points_ts, — только по явному флагу, в окно
+                # обслуживания (без простоя — pg_repack --order-by).
+                op.execute("CLUSTER tracking_points USING uq_tracking_points_session_ts_kind")
+                if "tracking_points" not in analyze:
+                    analyze.append("tracking_points")
+            # Без статистики планировщик не знает о новых индексах до
+            # ближайшего autovacuum — собираем её сразу.
+            for table in analyze:
+                op.execute(f"ANALYZE {table}")
+        return
+
+    for table, name, columns in missing:
+        op.create_index(name, table, columns)
 
 
 def downgrade():
-    conn = op.get_bind()
+    insp = Introspect(op.get_bind())
     # drop in reverse order, only if exist
-    if _table_exists(conn, "duty_events") and _index_exists(conn, "duty_events", "ix_duty_events_shift_ts"):
-        op.drop_index("ix_duty_events_shift_ts", table_name="duty_events")
-    if _table_exists(conn, "tracking_points") and _index_exists(conn, "tracking_points", "ix_tracking_points_user_ts"):
-        op.drop_index("ix_tracking_points_user_ts", table_name="tracking_points")
-    if _table_exists(conn, "tracking_points") and _index_exists(conn, "tracking_points", "ix_tracking_points_session_ts"):
-        op.drop_index("ix_tracking_points_session_ts", table_name="tracking_points")
-    if _table_exists(conn, "chat_messages") and _index_exists(conn, "chat_messages", "ix_chat_messages_user_sender_isread"):
-        op.drop_index("ix_chat_messages_user_sender_isread", table_name="chat_messages")
+    names = [(table, name) for table, name, _columns in reversed(_INDEXES)]
+    for table, name in names + list(_LEGACY_INDEXES):
+        if insp.should_drop_index(table, name):
+            op.drop_index(name, table_name=table, if_exists=insp.if_exists)
@@ -8,74 +8,65 @@ Create Date: 2026-01-02
 from __future__ import annotations
 
 import os
-import sys
 
 from alembic import op
+from alembic.util import load_python_file
 import sqlalchemy as sa
-from sqlalchemy import inspect
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 revision = "0004_alert_notify_log"
 down_revision = "0003_perf_indexes"
 branch_labels = None
 depends_on = None
 
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
 
-def _table_exists(conn, name: str) -> bool:
-    try:
-        return name in inspect(conn).get_table_names()
-    except Exception:
-        return False
-
+# PK пишущих логов сразу BIGINT, как _BIG_ID в 0001: смена типа потом
+# переписывает всю таблицу. В SQLite автоинкремент только у INTEGER PK.
+_BIG_ID = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
 
-def _index_exists(conn, table: str, index_name: str) -> bool:
-    try:
-        for ix in inspect(conn).get_indexes(table):
-            if ix.get("name") == index_name:
-                return True
-    except Exception:
-        return False
-    return False
+# Лог пишется по порядку sent_at, а одиночный индекс по нему нужен только
+# для диапазонов (чистка, счётчики) — в Postgres хватает BRIN, как в 0001.
+_BRIN_KW = {"postgresql_using": "brin", "postgresql_with": {"pages_per_range": 32}}
 
 
 def upgrade():
-    conn = op.get_bind()
+    insp = Introspect(op.get_bind())
 
-    if not _table_exists(conn, "tracker_alert_notify_log"):
+    if insp.should_create_table("tracker_alert_notify_log"):
         op.create_table(
             "tracker_alert_notify_log",
-            sa.Column("id", sa.Integer(), primary_key=True),
-            sa.Column("device_id", sa.String(length=32), nullable=True, index=True),
-            sa.Column("user_id", sa.String(length=32), nullable=True, index=True),
-            sa.Column("kind", sa.String(length=32), nullable=False, index=True),
-            sa.Column("severity", sa.String(length=16), nullable=True, index=True),
-            sa.Column("sent_to", sa.String(length=64), nullable=False, index=True),
-            sa.Column("sent_at", sa.DateTime(), nullable=True, index=True),
+            sa.Column("id", _BIG_ID, primary_key=True),
+            sa.Column("device_id", sa.String(length=32), nullable=True),
+            sa.Column("user_id", sa.String(length=32), nullable=True),
+            sa.Column("kind", sa.String(length=32), nullable=False),
+            sa.Column("severity", sa.String(length=16), nullable=True),
+            sa.Column("sent_to", sa.String(length=64), nullable=False),
+            sa.Column("sent_at", sa.DateTime(), nullable=True),
             sa.Column("digest", sa.String(length=64), nullable=True),
+            if_not_exists=insp.if_not_exists,
         )
-
-    # дополнительные индексы (для некоторых БД index=True внутри create_table не создаёт)
-    if _table_exists(conn, "tracker_alert_notify_log") and not _index_exists(conn, "tracker_alert_notify_log", "ix_tracker_alert_notify_device_kind"):
-        op.create_index(
-            "ix_tracker_alert_notify_device_kind",
-            "tracker_alert_notify_log",
-            ["device_id", "kind"],
-        )
-    if _table_exists(conn, "tracker_alert_notify_log") and not _index_exists(conn, "tracker_alert_notify_log", "ix_tracker_alert_notify_sent_at"):
-        op.create_index(
-            "ix_tracker_alert_notify_sent_at",
-            "tracker_alert_notify_log",
-            ["sent_at"],
-        )
+        insp.add_table("tracker_alert_notify_log")
+
+    # Индексы отдельными CREATE INDEX, а не index=True в create_table:
+    # для index=True alembic не добавляет IF NOT EXISTS. Отдельных индексов
+    # по device_id и sent_at нет: их покрывают составные ниже.
+    for name, columns, kw in (
+        ("ix_tracker_alert_notify_log_user_id", ["user_id"], {}),
+        ("ix_tracker_alert_notify_log_kind", ["kind"], {}),
+        ("ix_tracker_alert_notify_log_severity", ["severity"], {}),
+        ("ix_tracker_alert_notify_log_sent_to", ["sent_to"], {}),
+        # троттлинг (tg_notify._throttle_ok): последняя отправка по
+        # device_id/kind/sent_to — один проход индекса с конца
+        ("ix_tracker_alert_notify_device_kind", ["device_id", "kind", "sent_to", "sent_at"], {}),
+        ("ix_tracker_alert_notify_sent_at", ["sent_at"], _BRIN_KW),
+    ):
+        if insp.should_create_index("tracker_alert_notify_log", name):
+            op.create_index(name, "tracker_alert_notify_log", columns, if_not_exists=insp.if_not_exists, **kw)
 
 
 def downgrade():
-    conn = op.get_bind()
-    if _table_exists(conn, "tracker_alert_notify_log"):
-        # drop indexes first
-        if _index_exists(conn, "tracker_alert_notify_log", "ix_tracker_alert_notify_sent_at"):
-            op.drop_index("ix_tracker_alert_notify_sent_at", table_name="tracker_alert_notify_log")
-        if _index_exists(conn, "tracker_alert_notify_log", "ix_tracker_alert_notify_device_kind"):
-            op.drop_index("ix_tracker_alert_notify_device_kind", table_name="tracker_alert_notify_log")
-        op.drop_table("tracker_alert_notify_log")
+    insp = Introspect(op.get_bind())
+    # Индексы уходят вместе с таблицей.
+    if insp.should_drop_table("tracker_alert_notify_log"):
+        op.drop_table("tracker_alert_notify_log", if_exists=insp.if_exists)
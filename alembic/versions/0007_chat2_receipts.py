@@ -10,49 +10,37 @@ Create Date: 2026-01-16
 from __future__ import annotations
 
 import os
-import sys
 from alembic import op
+from alembic.util import load_python_file
 import sqlalchemy as sa
-from sqlalchemy import inspect
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 revision = "0007_chat2_receipts"
 down_revision = "0006_chat2_media_fields"
 branch_labels = None
 depends_on = None
 
-
-def _column_exists(conn, table_name: str, column_name: str) -> bool:
-    insp = inspect(conn)
-    try:
-        cols = {c.get('name') for c in insp.get_columns(table_name)}
-        return column_name in cols
-    except Exception:
-        return False
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
 
 
 def upgrade():
     conn = op.get_bind()
+    insp = Introspect(conn)
     # добавляем delivered_count и read_count, если ещё не созданы
-    for col_name in [
-        ("delivered_count", sa.Integer(), 0),
-        ("read_count", sa.Integer(), 0),
-    ]:
-        name, ctype, default_val = col_name
-        if not _column_exists(conn, "chat2_messages", name):
-            op.add_column(
-                "chat2_messages",
-                sa.Column(name, ctype, nullable=False, server_default=str(default_val)),
-            )
-    # Убираем server_default сразу после создания, чтобы не оставлять его в схеме
-    # (это не критично для SQLite, но желательно для других БД).
-    op.alter_column("chat2_messages", "delivered_count", server_default=None)
-    op.alter_column("chat2_messages", "read_count", server_default=None)
+    insp.add_missing_columns("chat2_messages", [
+        sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+        for name in ("delivered_count", "read_count")
+    ])
+    # Убираем server_default сразу после создания, чтобы не оставлять его в схеме.
+    # SQLite не умеет ALTER COLUMN: пришлось бы пересобирать всю таблицу ради
+    # некритичного default'а, поэтому там он остаётся.
+    if conn.dialect.name != "sqlite":
+        op.alter_column("chat2_messages", "delivered_count", server_default=None)
+        op.alter_column("chat2_messages", "read_count", server_default=None)
 
 
 def downgrade():
-    conn = op.get_bind()
+    insp = Introspect(op.get_bind())
     for col in ["read_count", "delivered_count"]:
-        if _column_exists(conn, "chat2_messages", col):
+        if insp.has_column("chat2_messages", col):
             op.drop_column("chat2_messages", col)
\ No newline at end of file
@@ -14,13 +14,9 @@ Create Date: 2026-01-18
 from __future__ import annotations
 
 import os
-import sys
 from alembic import op
+from alembic.util import load_python_file
 import sqlalchemy as sa
-from sqlalchemy import inspect
-
-# Добавляем путь к корню проекта, чтобы избежать ошибок импорта
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 # revision identifiers, used by Alembic.
 revision = '0009_objects_and_cameras'
@@ -28,28 +24,14 @@ down_revision = '0008_chat2_meta_push'
 branch_labels = None
 depends_on = None
 
-
-def _table_exists(conn, name: str) -> bool:
-    try:
-        return name in inspect(conn).get_table_names()
-    except Exception:
-        return False
-
-
-def _index_exists(conn, table: str, index_name: str) -> bool:
-    try:
-        for ix in inspect(conn).get_indexes(table):
-            if ix.get("name") == index_name:
-                return True
-    except Exception:
-        return False
-    return False
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
 
 
 def upgrade():
-    conn = op.get_bind()
+    insp = Introspect(op.get_bind())
     # objects table
-    if not _table_exists(conn, 'objects'):
+    if insp.should_create_table('objects'):
         op.create_table(
             'objects',
             sa.Column('id', sa.Integer(), primary_key=True),
@@ -60,12 +42,13 @@ def upgrade():
             sa.Column('tags', sa.String(length=255), nullable=True),
             sa.Column('created_at', sa.DateTime(), nullable=False),
             sa.Column('updated_at', sa.DateTime(), nullable=False),
+            if_not_exists=insp.if_not_exists,
         )
         # index by created_at for sorting
-        op.create_index('ix_objects_created_at', 'objects', ['created_at'])
+        op.create_index('ix_objects_created_at', 'objects', ['created_at'], if_not_exists=insp.if_not_exists)
 
     # object_cameras table
-    if not _table_exists(conn, 'object_cameras'):
+    if insp.should_create_table('object_cameras'):
         op.create_table(
             'object_cameras',
             sa.Column('id', sa.Integer(), primary_key=True),
@@ -73,27 +56,16 @@ def upgrade():
             sa.Column('label', sa.String(length=255), nullable=True),
             sa.Column('url', sa.String(length=512), nullable=False),
             sa.Column('type', sa.String(length=32), nullable=True),
+            # FK прямо в CREATE TABLE: отдельный ALTER SQLite не умеет
+            sa.ForeignKeyConstraint(['object_id'], ['objects.id'], name='fk_object_cameras_object', ondelete='CASCADE'),
+            if_not_exists=insp.if_not_exists,
         )
-        op.create_index('ix_object_cameras_object_id', 'object_cameras', ['object_id'])
-        # Foreign key constraint
-        op.create_foreign_key(
-            'fk_object_cameras_object',
-            'object_cameras',
-            'objects',
-            ['object_id'],
-            ['id'],
-            ondelete='CASCADE',
-        )
+        op.create_index('ix_object_cameras_object_id', 'object_cameras', ['object_id'], if_not_exists=insp.if_not_exists)
 
 
 def downgrade():
-    conn = op.get_bind()
-    # Drop cameras first due to FK
-    if _table_exists(conn, 'object_cameras'):
-        if _index_exists(conn, 'object_cameras', 'ix_object_cameras_object_id'):
-            op.drop_index('ix_object_cameras_object_id', table_name='object_cameras')
-        op.drop_table('object_cameras')
-    if _table_exists(conn, 'objects'):
-        if _index_exists(conn, 'objects', 'ix_objects_created_at'):
-            op.drop_index('ix_objects_created_at', table_name='objects')
-        op.drop_table('objects')
\ No newline at end of file
+    insp = Introspect(op.get_bind())
+    # Drop cameras first due to FK; индексы уходят вместе с таблицами.
+    for table in ('object_cameras', 'objects'):
+        if insp.should_drop_table(table):
+            op.drop_table(table, if_exists=insp.if_exists)
@@ -14,13 +14,9 @@ Create Date: 2026-01-18
 from __future__ import annotations
 
 import os
-import sys
 from alembic import op
+from alembic.util import load_python_file
 import sqlalchemy as sa
-from sqlalchemy import inspect
-
-# Добавляем путь к корню проекта, чтобы избежать ошибок импорта
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 # revision identifiers, used by Alembic.
 revision = '0010_incidents'
@@ -28,30 +24,23 @@ down_revision = '0009_objects_and_cameras'
 branch_labels = None
 depends_on = None
 
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
 
-def _table_exists(conn, name: str) -> bool:
-    """Проверить существование таблицы."""
-    try:
-        return name in inspect(conn).get_table_names()
-    except Exception:
-        return False
-
+# Таймлайн событий читается по incident_id; индекс по ts нужен только для
+# диапазонов по времени, а строки пишутся по порядку ts — в Postgres хватает
+# BRIN (как в 0001). Остальные диалекты строят обычный индекс.
+_BRIN_KW = {'postgresql_using': 'brin', 'postgresql_with': {'pages_per_range': 32}}
 
-def _index_exists(conn, table: str, index_name: str) -> bool:
-    """Проверить существование индекса."""
-    try:
-        for ix in inspect(conn).get_indexes(table):
-            if ix.get("name") == index_name:
-                return True
-    except Exception:
-        return False
-    return False
+# PK событий и назначений сразу BIGINT, как _BIG_ID в 0001: смена типа потом
+# переписывает всю таблицу. В SQLite автоинкремент только у INTEGER PK.
+_BIG_ID = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
 
 
 def upgrade():
-    conn = op.get_bind()
+    insp = Introspect(op.get_bind())
     # incidents table
-    if not _table_exists(conn, 'incidents'):
+    if insp.should_create_table('incidents'):
         op.create_table(
             'incidents',
             sa.Column('id', sa.Integer(), primary_key=True),
@@ -64,46 +53,43 @@ def upgrade():
             sa.Column('status', sa.String(length=32), nullable=False, server_default='new'),
             sa.Column('created_at', sa.DateTime(), nullable=False),
             sa.Column('updated_at', sa.DateTime(), nullable=False),
+            # FK прямо в CREATE TABLE: отдельный ALTER SQLite не умеет
+            sa.ForeignKeyConstraint(['object_id'], ['objects.id'], name='fk_incidents_object', ondelete='SET NULL'),
+            if_not_exists=insp.if_not_exists,
         )
-        op.create_index('ix_incidents_created_at', 'incidents', ['created_at'])
-        op.create_index('ix_incidents_status', 'incidents', ['status'])
-        op.create_index('ix_incidents_priority', 'incidents', ['priority'])
-        # FK to objects (nullable)
-        op.create_foreign_key(
-            'fk_incidents_object',
+        op.create_index('ix_incidents_created_at', 'incidents', ['created_at'], if_not_exists=insp.if_not_exists)
+        # Запросы идут по открытым инцидентам (всё, кроме closed), а закрытых
+        # со временем подавляющее большинство — индексируем только открытые.
+        op.create_index(
+            'ix_incidents_open',
             'incidents',
-            'objects',
-            ['object_id'],
-            ['id'],
-            ondelete='SET NULL',
+            ['status', 'priority', 'created_at'],
+            postgresql_where=sa.text("status <> 'closed'"),
+            sqlite_where=sa.text("status <> 'closed'"),
+            if_not_exists=insp.if_not_exists,
         )
+        op.create_index('ix_incidents_priority', 'incidents', ['priority'], if_not_exists=insp.if_not_exists)
 
     # incident_events table
-    if not _table_exists(conn, 'incident_events'):
+    if insp.should_create_table('incident_events'):
         op.create_table(
             'incident_events',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('id', _BIG_ID, primary_key=True),
             sa.Column('incident_id', sa.Integer(), nullable=False),
             sa.Column('event_type', sa.String(length=64), nullable=False),
             sa.Column('payload_json', sa.Text(), nullable=True),
             sa.Column('ts', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['incident_id'], ['incidents.id'], name='fk_incident_events_incident', ondelete='CASCADE'),
+            if_not_exists=insp.if_not_exists,
         )
-        op.create_index('ix_incident_events_incident', 'incident_events', ['incident_id'])
-        op.create_index('ix_incident_events_ts', 'incident_events', ['ts'])
-        op.create_foreign_key(
-            'fk_incident_events_incident',
-            'incident_events',
-            'incidents',
-            ['incident_id'],
-            ['id'],
-            ondelete='CASCADE',
-        )
+        op.create_index('ix_incident_events_incident', 'incident_events', ['incident_id'], if_not_exists=insp.if_not_exists)
+        op.create_index('ix_incident_events_ts', 'incident_events', ['ts'], if_not_exists=insp.if_not_exists, **_BRIN_KW)
 
     # incident_assignments table
-    if not _table_exists(conn, 'incident_assignments'):
+    if insp.should_create_table('incident_assignments'):
         op.create_table(
             'incident_assignments',
-            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('id', _BIG_ID, primary_key=True),
             sa.Column('incident_id', sa.Integer(), nullable=False),
             sa.Column('shift_id', sa.Integer(), nullable=False),
             sa.Column('assigned_at', sa.DateTime(), nullable=True),
@@ -112,48 +98,19 @@ def upgrade():
             sa.Column('on_scene_at', sa.DateTime(), nullable=True),
             sa.Column('resolved_at', sa.DateTime(), nullable=True),
             sa.Column('closed_at', sa.DateTime(), nullable=True),
+            # FKs
+            sa.ForeignKeyConstraint(['incident_id'], ['incidents.id'], name='fk_incident_assignments_incident', ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['shift_id'], ['duty_shifts.id'], name='fk_incident_assignments_shift', ondelete='CASCADE'),
+            if_not_exists=insp.if_not_exists,
         )
-        op.create_index('ix_incident_assignments_incident', 'incident_assignments', ['incident_id'])
-        op.create_index('ix_incident_assignments_shift', 'incident_assignments', ['shift_id'])
-        # FKs
-        op.create_foreign_key(
-            'fk_incident_assignments_incident',
-            'incident_assignments',
-            'incidents',
-            ['incident_id'],
-            ['id'],
-            ondelete='CASCADE',
-        )
-        op.create_foreign_key(
-            'fk_incident_assignments_shift',
-            'incident_assignments',
-            'duty_shifts',
-            ['shift_id'],
-            ['id'],
-            ondelete='CASCADE',
-        )
+        op.create_index('ix_incident_assignments_incident', 'incident_assignments', ['incident_id'], if_not_exists=insp.if_not_exists)
+        op.create_index('ix_incident_assignments_shift', 'incident_assignments', ['shift_id'], if_not_exists=insp.if_not_exists)
 
 
 def downgrade():
-    conn = op.get_bind()
-    # Drop in reverse order to respect dependencies
-    if _table_exists(conn, 'incident_assignments'):
-        if _index_exists(conn, 'incident_assignments', 'ix_incident_assignments_incident'):
-            op.drop_index('ix_incident_assignments_incident', table_name='incident_assignments')
-        if _index_exists(conn, 'incident_assignments', 'ix_incident_assignments_shift'):
-            op.drop_index('ix_incident_assignments_shift', table_name='incident_assignments')
-        op.drop_table('incident_assignments')
-    if _table_exists(conn, 'incident_events'):
-        if _index_exists(conn, 'incident_events', 'ix_incident_events_incident'):
-            op.drop_index('ix_incident_events_incident', table_name='incident_events')
-        if _index_exists(conn, 'incident_events', 'ix_incident_events_ts'):
-            op.drop_index('ix_incident_events_ts', table_name='incident_events')
-        op.drop_table('incident_events')
-    if _table_exists(conn, 'incidents'):
-        if _index_exists(conn, 'incidents', 'ix_incidents_created_at'):
-            op.drop_index('ix_incidents_created_at', table_name='incidents')
-        if _index_exists(conn, 'incidents', 'ix_incidents_status'):
-            op.drop_index('ix_incidents_status', table_name='incidents')
-        if _index_exists(conn, 'incidents', 'ix_incidents_priority'):
-            op.drop_index('ix_incidents_priority', table_name='incidents')
-        op.drop_table('incidents')
\ No newline at end of file
+    insp = Introspect(op.get_bind())
+    # Drop in reverse order to respect dependencies; индексы уходят
+    # вместе с таблицами.
+    for table in ('incident_assignments', 'incident_events', 'incidents'):
+        if insp.should_drop_table(table):
+            op.drop_table(table, if_exists=insp.if_exists)
@@ -23,6 +23,26 @@ down_revision = '0010_incidents'
 branch_labels = None
 depends_on = None
 
+_BACKFILL_BATCH = 10000
+
+_BACKFILL_GEOM = """
+DO $$
+DECLARE
+    last_id bigint := 0;
+    max_id bigint;
+BEGIN
+    SELECT max(id) INTO max_id FROM {table};
+    WHILE last_id < coalesce(max_id, 0) LOOP
+        UPDATE {table}
+        SET geom = ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+        WHERE id > last_id AND id <= last_id + {batch}
+          AND geom IS NULL AND lon IS NOT NULL AND lat IS NOT NULL;
+        last_id := last_id + {batch};
+        COMMIT;
+    END LOOP;
+END $$
+"""
+
 
 def upgrade() -> None:
     bind = op.get_bind()
@@ -34,16 +54,18 @@ def upgrade() -> None:
     op.add_column('addresses', sa.Column('geom', Geometry(geometry_type='POINT', srid=4326), nullable=True))
     op.add_column('pending_markers', sa.Column('geom', Geometry(geometry_type='POINT', srid=4326), nullable=True))
 
-    op.execute(sa.text("""
-        UPDATE addresses
-        SET geom = ST_SetSRID(ST_MakePoint(lon, lat), 4326)
-        WHERE lon IS NOT NULL AND lat IS NOT NULL
-    """))
-    op.execute(sa.text("""
-        UPDATE pending_markers
-        SET geom = ST_SetSRID(ST_MakePoint(lon, lat), 4326)
-        WHERE lon IS NOT NULL AND lat IS NOT NULL
-    """))
+    # Backfill пачками по диапазонам id с COMMIT после каждой: нет одной
+    # гигантской транзакции и WAL-записи, autovacuum успевает между пачками,
+    # а прерванный запуск продолжается с незаполненных строк. COMMIT внутри
+    # DO возможен только вне транзакции — отсюда autocommit_block.
+    with op.get_context().autocommit_block():
+        for table in ('addresses', 'pending_markers'):
+            op.execute(sa.text(_BACKFILL_GEOM.format(table=table, batch=_BACKFILL_BATCH)))
+
+    # Без GiST-индекса ST_DWithin/ST_Intersects по geom — полный проход таблицы.
+    # Строим после backfill: один проход вместо обновления индекса на каждую строку.
+    op.create_index('ix_addresses_geom', 'addresses', ['geom'], postgresql_using='gist', if_not_exists=True)
+    op.create_index('ix_pending_markers_geom', 'pending_markers', ['geom'], postgresql_using='gist', if_not_exists=True)
 
 
 def downgrade() -> None:
@@ -51,5 +73,7 @@ def downgrade() -> None:
     if bind.dialect.name != 'postgresql':
         return
 
+    op.drop_index('ix_pending_markers_geom', table_name='pending_markers', if_exists=True)
+    op.drop_index('ix_addresses_geom', table_name='addresses', if_exists=True)
     op.drop_column('pending_markers', 'geom')
     op.drop_column('addresses', 'geom')
@@ -30,41 +30,203 @@ _TABLES = (
 )
 
 
-def _migrate_postgres() -> None:
-    # Безопасный парсер: возвращает NULL для невалидного JSON вместо ошибки.
-    op.execute(
-        """
-        CREATE OR REPLACE FUNCTION _safe_text_to_jsonb(src text)
-        RETURNS jsonb
-        LANGUAGE plpgsql
-        AS $$
+_UPDATE_BATCH = 50000
+
+# UPDATE всей таблицы пачками по диапазонам id с COMMIT после каждой (как
+# backfill в 0011): блокировки строк и WAL ограничены пачкой, autovacuum
+# успевает между пачками. Диапазоны идут по PK.
+_BATCHED_UPDATE = """
+DO $$
+DECLARE
+    last_id bigint := 0;
+    max_id bigint;
+BEGIN
+    SELECT max(id) INTO max_id FROM {table};
+    WHILE last_id < coalesce(max_id, 0) LOOP
+        UPDATE {table}
+        SET {column} = {value}
+        WHERE id > last_id AND id <= last_id + {batch} AND {only};
+        last_id := last_id + {batch};
+        COMMIT;
+    END LOOP;
+END $$
+"""
+
+# То же, но если быстрое ``value`` падает на какой-то строке пачки, пачка
+# пересчитывается через ``fallback``. Подтранзакция — одна на пачку, а не
+# на строку; COMMIT стоит вне блока EXCEPTION, как того требует PL/pgSQL.
+_BATCHED_UPDATE_WITH_FALLBACK = """
+DO $$
+DECLARE
+    last_id bigint := 0;
+    max_id bigint;
+BEGIN
+    SELECT max(id) INTO max_id FROM {table};
+    WHILE last_id < coalesce(max_id, 0) LOOP
         BEGIN
-            IF src IS NULL OR btrim(src) = '' THEN
-                RETURN NULL;
-            END IF;
-            RETURN src::jsonb;
+            UPDATE {table}
+            SET {column} = {value}
+            WHERE id > last_id AND id <= last_id + {batch} AND {only};
         EXCEPTION WHEN others THEN
-            RETURN NULL;
+            UPDATE {table}
+            SET {column} = {fallback}
+            WHERE id > last_id AND id <= last_id + {batch} AND {only};
         END;
-        $$;
-        """
-    )
+        last_id := last_id + {batch};
+        COMMIT;
+    END LOOP;
+END $$
+"""
+
+
+def _update_in_batches(table: str, column: str, value: str, only: str, fallback: str | None = None) -> None:
+    """``column = value`` для строк ``only``; остальные остаются NULL.
 
+    Строки без исходного значения не трогаем: в Postgres каждый UPDATE —
+    новая версия строки и запись в WAL, даже если значение не меняется.
+    ``fallback`` — выражение для пачек, на которых ``value`` падает.
+    """
+    params = dict(table=table, column=column, value=value, only=only, batch=_UPDATE_BATCH)
+    if fallback is None:
+        sql = _BATCHED_UPDATE.format(**params)
+    else:
+        sql = _BATCHED_UPDATE_WITH_FALLBACK.format(fallback=fallback, **params)
+    # COMMIT внутри DO возможен только вне транзакции — отсюда
+    # autocommit_block; DDL ревизии до него уже зафиксирован.
+    with op.get_context().autocommit_block():
+        op.execute(sql)
+    # Строки, записанные во время пачек, добираем в одной транзакции
+    # с последующим DROP COLUMN (их мало — сразу надёжным выражением).
+    op.execute(f"UPDATE {table} SET {column} = {fallback or value} WHERE {column} IS NULL AND {only}")
+
+
+# Безопасный парсер для PostgreSQL < 16: возвращает NULL для невалидного
+# JSON вместо ошибки. Блок EXCEPTION открывает подтранзакцию на каждый вызов,
+# поэтому на 16+ вместо него pg_input_is_valid, а до 16 он вызывается только
+# для подозрительных строк и упавших пачек (см. _migrate_postgres).
+_SAFE_TEXT_TO_JSONB = """
+CREATE OR REPLACE FUNCTION _safe_text_to_jsonb(src text)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF src IS NULL OR btrim(src) = '' THEN
+        RETURN NULL;
+    END IF;
+    RETURN src::jsonb;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$;
+"""
+
+
+def _migrate_postgres() -> None:
+    version = op.get_bind().dialect.server_version_info
+    # PostgreSQL 16+ проверяет текст без исключений — один set-based UPDATE
+    # без подтранзакции на строку. CASE вычисляется по порядку, так что
+    # приведение выполняется только для валидного JSON.
+    if version is not None and version >= (16,):
+        converted = (
+            "CASE WHEN pg_input_is_valid(payload_json, 'jsonb')"
+            " THEN payload_json::jsonb ELSE '{}'::jsonb END"
+        )
+        fallback = None
+    else:
+        op.execute(_SAFE_TEXT_TO_JSONB)
+        fallback = "COALESCE(_safe_text_to_jsonb(payload_json), '{}'::jsonb)"
+        # Обычный текст приводим простым ::jsonb. Escape \u0000 — валидный
+        # JSON, который jsonb не принимает: такие строки сразу идут через
+        # безопасный парсер, чтобы не ронять из-за них всю пачку.
+        converted = (
+            "CASE WHEN strpos(payload_json, '\\u0000') > 0"
+            f" THEN {fallback} ELSE payload_json::jsonb END"
+        )
+
+    # Пустой payload_json остаётся NULL в payload.
+    only = "btrim(payload_json) <> ''"
     for table in _TABLES:
         op.add_column(table, sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
-        op.execute(
-            f"""
-            UPDATE {table}
-            SET payload = CASE
-                WHEN payload_json IS NULL OR btrim(payload_json) = '' THEN NULL
-                ELSE COALESCE(_safe_text_to_jsonb(payload_json), '{{}}'::jsonb)
-            END
-            """
-        )
+        # Временный частичный индекс по id только для строк с payload: пачка
+        # находит их по индексу и не читает строки, которые не обновляет.
+        # Предикат совпадает с условием UPDATE дословно — планировщик
+        # гарантированно его применит.
+        index = f"_tmp_mig0013_{table}_nn"
+        with op.get_context().autocommit_block():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {table} (id) WHERE {only}")
+        _update_in_batches(table, 'payload', converted, only, fallback)
+        op.execute(f"DROP INDEX IF EXISTS {index}")
         op.drop_column(table, 'payload_json')
 
     op.execute("DROP FUNCTION IF EXISTS _safe_text_to_jsonb(text);")
 
+    # Поиск событий инцидента по содержимому (payload @> '{"shift_id": 1}')
+    # идёт по GIN-индексу, а не полным проходом. jsonb_path_ops меньше
+    # стандартного jsonb_ops и обслуживает ровно @>.
+    op.create_index(
+        'ix_incident_events_payload',
+        'incident_events',
+        [sa.text('payload jsonb_path_ops')],
+        postgresql_using='gin',
+        if_not_exists=True,
+    )
+
+
+# Строк на один SELECT/executemany в Python-пути (SQLite и прочие).
+_BATCH = 5000
+
+
+def _payload_text(raw):
+    """Текст для колонки payload: исходная строка, если это валидный JSON.
+
+    json.loads только проверяет — в БД уходит тот же текст, без повторной
+    сериализации (JSON в SQLite и так хранится текстом). Невалидный — '{}'.
+    """
+    if raw is None or (isinstance(raw, str) and not raw.strip()):
+        return None
+    if not isinstance(raw, str):
+        return json.dumps(raw, ensure_ascii=False)
+    try:
+        json.loads(raw)
+    except Exception:
+        return '{}'
+    return raw
+
+
+def _dump_payload(raw):
+    if raw is None or isinstance(raw, str):
+        return raw
+    return json.dumps(raw, ensure_ascii=False)
+
+
+def _convert_rows(bind, table: str, src: str, dst: str, convert) -> None:
+    """Переложить ``src`` в ``dst`` через Python пачками по ``_BATCH`` строк.
+
+    Страницы читаются по id (keyset), а не одним list(): память ограничена
+    пачкой, и таблица не меняется под открытым курсором. Каждая пачка
+    уходит одним executemany вместо UPDATE на строку.
+    """
+    t = sa.table(table, sa.column('id'), sa.column(src))
+    # Строки без значения не читаем и не пишем: ``dst`` у них и так NULL.
+    page = sa.select(t.c.id, t.c[src]).where(t.c[src].is_not(None)).order_by(t.c.id).limit(_BATCH)
+    # Типы параметров заданы явно: без выведения типа по значениям пачки.
+    # value — уже готовый текст JSON, поэтому Text, а не sa.JSON (иначе
+    # строка сериализуется второй раз).
+    update = sa.text(f"UPDATE {table} SET {dst} = :value WHERE id = :id").bindparams(
+        sa.bindparam('value', type_=sa.Text()),
+        sa.bindparam('id', type_=sa.Integer()),
+    )
+    rows = bind.execute(page).all()
+    while rows:
+        params = []
+        for row_id, raw in rows:
+            value = convert(raw)
+            if value is not None:
+                params.append({'value': value, 'id': row_id})
+        if params:
+            bind.execute(update, params)
+        rows = bind.execute(page.where(t.c.id > rows[-1][0])).all()
+
 
 def _migrate_generic() -> None:
     # Fallback для SQLite/других БД в dev/test: преобразуем Python-ом.
@@ -72,22 +234,7 @@ def _migrate_generic() -> None:
 
     for table in _TABLES:
         op.add_column(table, sa.Column('payload', sa.JSON(), nullable=True))
-
-        rows = list(bind.execute(sa.text(f"SELECT id, payload_json FROM {table}")))
-        for row in rows:
-            raw = row[1]
-            if raw is None or (isinstance(raw, str) and not raw.strip()):
-                parsed = None
-            else:
-                try:
-                    parsed = json.loads(raw) if isinstance(raw, str) else raw
-                except Exception:
-                    parsed = {}
-            bind.execute(
-                sa.text(f"UPDATE {table} SET payload = :payload WHERE id = :id"),
-                {'payload': parsed, 'id': row[0]},
-            )
-
+        _convert_rows(bind, table, 'payload_json', 'payload', _payload_text)
         op.drop_column(table, 'payload_json')
 
 
@@ -101,32 +248,18 @@ def upgrade() -> None:
 
 def downgrade() -> None:
     bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_incident_events_payload', table_name='incident_events', if_exists=True)
 
     for table in _TABLES:
         op.add_column(table, sa.Column('payload_json', sa.Text(), nullable=True))
         if bind.dialect.name == 'postgresql':
-            op.execute(
-                f"""
-                UPDATE {table}
-                SET payload_json = CASE
-                    WHEN payload IS NULL THEN NULL
-                    ELSE payload::text
-                END
-                """
-            )
+            _update_in_batches(table, 'payload_json', 'payload::text', 'payload IS NOT NULL')
+        elif bind.dialect.name == 'sqlite':
+            # JSON в SQLite — тот же текст (числа колонка приводит к числу,
+            # TEXT-колонка — обратно к строке): копия одним UPDATE без Python.
+            op.execute(f"UPDATE {table} SET payload_json = payload WHERE payload IS NOT NULL")
         else:
-            rows = list(bind.execute(sa.text(f"SELECT id, payload FROM {table}")))
-            for row in rows:
-                raw = row[1]
-                if raw is None:
-                    payload_json = None
-                elif isinstance(raw, str):
-                    payload_json = raw
-                else:
-                    payload_json = json.dumps(raw, ensure_ascii=False)
-                bind.execute(
-                    sa.text(f"UPDATE {table} SET payload_json = :payload_json WHERE id = :id"),
-                    {'payload_json': payload_json, 'id': row[0]},
-                )
+            _convert_rows(bind, table, 'payload', 'payload_json', _dump_payload)
 
         op.drop_column(table, 'payload')
@@ -0,0 +1,91 @@
+"""indexes for the address list filters and sort
+
+Revision ID: 0014_address_list_indexes
+Revises: 0013_payload_json_to_jsonb_safe
+Create Date: 2026-02-24
+"""
+
+from __future__ import annotations
+
+import os
+
+from alembic import op
+from alembic.util import load_python_file
+
+revision = '0014_address_list_indexes'
+down_revision = '0013_payload_json_to_jsonb_safe'
+branch_labels = None
+depends_on = None
+
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
+
+
+# (индекс, колонки). Фильтр по category уже обслуживает
+# ix_addresses_category_status (category — первая колонка).
+_INDEXES = (
+    # list_addresses: ORDER BY created_at DESC, id DESC и курсор
+    # (created_at, id) < (...) — обратный проход по индексу без сортировки.
+    ('ix_addresses_created_id', ['created_at', 'id']),
+    # Ограничение по зонам админа (zone_id IN (...)) и фильтр по статусу.
+    ('ix_addresses_zone_status', ['zone_id', 'status']),
+)
+
+# Индекс create_all по одному created_at — префикс ix_addresses_created_id:
+# запросы по created_at обслуживает составной, а поддерживать при каждой
+# записи оба незачем.
+_REDUNDANT_INDEX = 'ix_addresses_created_at'
+
+# PostgreSQL: поиск q — ILIKE '%...%' по name и notes. B-tree такой шаблон
+# не использует, триграммный GIN — да (по индексу на колонку, OR собирается
+# через BitmapOr).
+_TRGM_INDEXES = (
+    ('ix_addresses_name_trgm', 'name'),
+    ('ix_addresses_notes_trgm', 'notes'),
+)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    insp = Introspect(conn)
+    if not insp.has_table('addresses'):
+        return
+
+    if conn.dialect.name != 'postgresql':
+        for name, columns in _INDEXES:
+            if insp.should_create_index('addresses', name):
+                op.create_index(name, 'addresses', columns, if_not_exists=insp.if_not_exists)
+        if insp.should_drop_index('addresses', _REDUNDANT_INDEX):
+            op.drop_index(_REDUNDANT_INDEX, table_name='addresses', if_exists=insp.if_exists)
+        return
+
+    # CONCURRENTLY не держит блокировку записи на время построения,
+    # но не работает внутри транзакции.
+    with op.get_context().autocommit_block():
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, columns in _INDEXES:
+            op.create_index(name, 'addresses', columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, column in _TRGM_INDEXES:
+            op.create_index(
+                name,
+                'addresses',
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.drop_index(_REDUNDANT_INDEX, table_name='addresses', postgresql_concurrently=True, if_exists=True)
+        op.execute('ANALYZE addresses')
+
+
+def downgrade() -> None:
+    insp = Introspect(op.get_bind())
+    names = [name for name, _columns in _INDEXES]
+    if op.get_bind().dialect.name == 'postgresql':
+        names += [name for name, _column in _TRGM_INDEXES]
+    # ix_addresses_created_at не возвращаем: его создавал только create_all.
+    # Расширение pg_trgm не удаляем: им могут пользоваться и другие объекты.
+    for name in reversed(names):
+        if insp.should_drop_index('addresses', name):
+            op.drop_index(name, table_name='addresses', if_exists=insp.if_exists)
@@ -0,0 +1,111 @@
+"""chat2 UUID keys: VARCHAR(36) -> uuid on PostgreSQL
+
+Revision ID: 0015_chat2_uuid_keys
+Revises: 0014_address_list_indexes
+Create Date: 2026-02-26
+
+Базы, где chat2-таблицы созданы ``create_all`` или старой 0005, хранят
+ключи строкой VARCHAR(36). Модели (``ChatId``) на PostgreSQL биндят их как
+``uuid`` — сравнение ``varchar = uuid`` там падает. Ревизия приводит
+колонки к ``uuid``, downgrade — обратно к VARCHAR(36); в остальных СУБД
+ничего не делает.
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = '0015_chat2_uuid_keys'
+down_revision = '0014_address_list_indexes'
+branch_labels = None
+depends_on = None
+
+
+# Таблица -> UUID-колонки chat2.
+_COLUMNS = {
+    'chat2_channels': ('id',),
+    'chat2_messages': ('id', 'channel_id'),
+    'chat2_members': ('channel_id', 'last_read_message_id'),
+}
+
+# FK на chat2_channels.id. Имена — как в 0005; у create_all они были
+# автоматическими (chat2_messages_channel_id_fkey), поэтому старые ищем
+# по каталогу.
+_FKS = (
+    ('chat2_messages', 'fk_chat2_messages_channel'),
+    ('chat2_members', 'fk_chat2_members_channel'),
+)
+
+# last_read_message_id до проверки в маршрутах сохранялся от клиента как есть
+# и может быть не UUID: такие значения обнуляем, а не роняем миграцию.
+_UUID_RE = '^[0-9a-fA-F]{8}-?([0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}$'
+
+
+def _column_types(conn) -> dict:
+    rows = conn.exec_driver_sql(
+        "SELECT table_name, column_name, data_type FROM information_schema.columns"
+        " WHERE table_schema = current_schema()"
+        " AND table_name IN ('chat2_channels', 'chat2_messages', 'chat2_members')"
+    )
+    return {(table, column): data_type for table, column, data_type in rows}
+
+
+def _drop_channel_fks(conn) -> None:
+    # Любые FK chat2_messages/chat2_members на chat2_channels, как бы они
+    # ни назывались.
+    rows = conn.exec_driver_sql(
+        "SELECT c.conrelid::regclass::text, c.conname FROM pg_constraint c"
+        " WHERE c.contype = 'f' AND c.confrelid = 'chat2_channels'::regclass"
+    ).fetchall()
+    for table, name in rows:
+        op.drop_constraint(name, table.strip('"'), type_='foreignkey')
+
+
+def _create_channel_fks(types: dict) -> None:
+    for table, name in _FKS:
+        if (table, 'channel_id') in types:
+            op.create_foreign_key(name, table, 'chat2_channels', ['channel_id'], ['id'])
+
+
+def _convert(to_uuid: bool) -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    types = _column_types(conn)
+    source = 'character varying' if to_uuid else 'uuid'
+    todo = {
+        table: [c for c in columns if types.get((table, c)) == source]
+        for table, columns in _COLUMNS.items()
+    }
+    if not any(todo.values()):
+        return
+
+    # Тип ключа и ссылающихся на него колонок меняется вместе: FK снимаем
+    # на время ALTER и возвращаем с именами из 0005.
+    has_channels = ('chat2_channels', 'id') in types
+    if has_channels:
+        _drop_channel_fks(conn)
+    for table, columns in todo.items():
+        if not columns:
+            continue
+        clauses = []
+        for column in columns:
+            if not to_uuid:
+                clauses.append(f'ALTER COLUMN {column} TYPE VARCHAR(36) USING {column}::text')
+            elif column == 'last_read_message_id':
+                using = f"CASE WHEN {column} ~ '{_UUID_RE}' THEN {column}::uuid END"
+                clauses.append(f'ALTER COLUMN {column} TYPE uuid USING {using}')
+            else:
+                clauses.append(f'ALTER COLUMN {column} TYPE uuid USING {column}::uuid')
+        # Одним ALTER TABLE на таблицу: одна перезапись и одна блокировка.
+        op.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+    if has_channels:
+        _create_channel_fks(types)
+
+
+def upgrade() -> None:
+    _convert(to_uuid=True)
+
+
+def downgrade() -> None:
+    _convert(to_uuid=False)
@@ -0,0 +1,49 @@
+"""addresses.created_at NOT NULL
+
+Revision ID: 0016_addresses_created_at_not_null
+Revises: 0015_chat2_uuid_keys
+Create Date: 2026-02-27
+
+Список адресов сортируется и листается курсором по (created_at, id).
+Строка с NULL в created_at ломает курсор и выпадает из сравнения
+кортежей, поэтому пустые даты заполняются (updated_at или текущим
+временем), а колонка становится NOT NULL.
+"""
+
+from __future__ import annotations
+
+import os
+
+import sqlalchemy as sa
+from alembic import op
+from alembic.util import load_python_file
+
+revision = '0016_addresses_created_at_not_null'
+down_revision = '0015_chat2_uuid_keys'
+branch_labels = None
+depends_on = None
+
+# Общий кэш интроспекции лежит рядом с env.py (см. alembic/_introspect.py).
+Introspect = load_python_file(os.path.join(os.path.dirname(__file__), ".."), "_introspect.py").Introspect
+
+
+def upgrade() -> None:
+    insp = Introspect(op.get_bind())
+    if not insp.has_table('addresses'):
+        return
+    op.execute(
+        'UPDATE addresses SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)'
+        ' WHERE created_at IS NULL'
+    )
+    # batch: SQLite меняет NOT NULL только пересозданием таблицы,
+    # на PostgreSQL это обычный ALTER COLUMN ... SET NOT NULL.
+    with op.batch_alter_table('addresses') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    insp = Introspect(op.get_bind())
+    if not insp.has_table('addresses'):
+        return
+    with op.batch_alter_table('addresses') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
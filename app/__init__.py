@@ -8,6 +8,7 @@ from flask import Flask, jsonify, redirect, request
 
 from .config import Config
 from .extensions import db, init_celery
+from .json_provider import OrjsonProvider
 
 
 def _register_blueprints(app: Flask) -> None:
@@ -70,12 +71,9 @@ def _register_blueprints(app: Flask) -> None:
 def _register_common_routes(app: Flask) -> None:
     @app.get("/")
     def root_redirect():
-        # Если пользователь авторизован — в командный центр,
-        # иначе — на основную карту (содержит форму входа).
-        from flask import session as _session
-        if _session.get('is_admin'):
-            return redirect("/admin/panel", code=302)
-        return redirect("/admin/panel", code=302)  # панель сама перенаправит на логин через 403→login
+        # Всегда в командный центр: неавторизованного панель сама
+        # перенаправит на логин (403 → /login).
+        return redirect("/admin/panel", code=302)
 
     @app.get("/health")
     def health():
@@ -85,14 +83,17 @@ def _register_common_routes(app: Flask) -> None:
     def ready():
         return jsonify(status="ok"), 200
 
+    # Настройки метрик читаются один раз, как и METRICS_PATH: эндпоинт
+    # опрашивается Prometheus'ом постоянно.
+    enable_metrics = app.config.get("ENABLE_METRICS", False)
+    allow_public = app.config.get("METRICS_ALLOW_PUBLIC", False)
+    api_key = (app.config.get("METRICS_API_KEY") or "").strip()
+
     @app.get(app.config.get("METRICS_PATH", "/metrics"))
     def metrics():
-        if not app.config.get("ENABLE_METRICS", False):
+        if not enable_metrics:
             return jsonify(error="metrics_disabled"), 404
 
-        allow_public = app.config.get("METRICS_ALLOW_PUBLIC", False)
-        api_key = (app.config.get("METRICS_API_KEY") or "").strip()
-
         if not allow_public and request.remote_addr not in {"127.0.0.1", "::1", None}:
             if not api_key or request.headers.get("X-API-KEY") != api_key:
                 return jsonify(error="forbidden"), 403
@@ -100,6 +101,24 @@ def _register_common_routes(app: Flask) -> None:
         return jsonify(status="ok"), 200
 
 
+def _serve_health_in_wsgi(app: Flask) -> None:
+    """Отвечать на GET/HEAD /health до Flask.
+
+    Пробы оркестратора приходят каждые несколько секунд, а ответ — всегда
+    пустой 204: маршрутизация, before/after_request и заголовки ему не
+    нужны. Маршрут /health остаётся для url_for и прочих методов.
+    """
+    wsgi_app = app.wsgi_app
+
+    def _wsgi(environ, start_response):
+        if environ.get("PATH_INFO") == "/health" and environ.get("REQUEST_METHOD") in ("GET", "HEAD"):
+            start_response("204 No Content", [])
+            return []
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = _wsgi
+
+
 def _register_error_handlers(app: Flask) -> None:
     @app.errorhandler(403)
     def _forbidden(_err):
@@ -111,6 +130,10 @@ def _register_error_handlers(app: Flask) -> None:
 def _apply_security_headers(app: Flask) -> None:
     @app.after_request
     def _set_headers(resp):
+        # Пустым ответам и пробе готовности заголовки ни к чему (/health
+        # сюда вообще не доходит — см. _serve_health_in_wsgi).
+        if resp.status_code in (204, 304) or request.path == "/ready":
+            return resp
         resp.headers.setdefault("X-Content-Type-Options", "nosniff")
         resp.headers.setdefault("X-Frame-Options", "DENY")
         resp.headers.setdefault("Referrer-Policy", "same-origin")
@@ -124,18 +147,25 @@ def create_app(config_class: type[Config] = Config) -> Flask:
         template_folder=os.path.join(os.path.dirname(__file__), "..", "templates"),
     )
     app.config.from_object(config_class)
+    app.json = OrjsonProvider(app)
 
     db.init_app(app)
     init_celery(app)
 
     with app.app_context():
         from . import models  # noqa: F401
-        db.create_all()
+        if app.config.get("CREATE_ALL_ON_BOOT", True):
+            db.create_all()
 
     os.makedirs(app.config.get("UPLOAD_FOLDER", "uploads"), exist_ok=True)
+    # Допустимые расширения загрузок — один раз, в нижнем регистре.
+    app.extensions["allowed_extensions"] = frozenset(
+        ext.lower() for ext in app.config.get("ALLOWED_EXTENSIONS") or ()
+    )
 
     _register_blueprints(app)
     _register_common_routes(app)
+    _serve_health_in_wsgi(app)
     _register_error_handlers(app)
     _apply_security_headers(app)
     return app
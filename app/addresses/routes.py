@@ -8,11 +8,13 @@
 """
 
 import os
-import uuid
-from io import StringIO
+import secrets
+from datetime import datetime
+from io import BytesIO, StringIO
 from typing import Any, Dict, List, Optional
 
-from flask import Response, jsonify, request, current_app, send_from_directory
+from flask import Response, jsonify, request, current_app, send_from_directory, stream_with_context
+from sqlalchemy import delete, func, or_, select, tuple_
 
 from ..helpers import (
     parse_coord,
@@ -24,18 +26,40 @@ from ..helpers import (
     get_current_admin,
 )
 from ..models import Address
+from ..services.addresses_service import import_addresses_from_csv
 from ..sockets import broadcast_event_sync
+from ..storage import save_upload
 from ..extensions import db
 
 from . import bp
 
+# Строк на одну выборку при потоковой выдаче списка и экспорте.
+_STREAM_BATCH = 500
 
-def _allowed_file(filename: str) -> bool:
-    """Проверить, имеет ли файл допустимое расширение."""
-    if not filename or '.' not in filename:
-        return False
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in current_app.config['ALLOWED_EXTENSIONS']
+
+def _photo_ext(filename: Optional[str]) -> Optional[str]:
+    """Расширение файла в нижнем регистре, если оно допустимо, иначе None.
+
+    Набор расширений собирается один раз в create_app (из ALLOWED_EXTENSIONS).
+    """
+    i = filename.rfind('.') if filename else -1
+    if i < 0:
+        return None
+    ext = filename[i + 1:].lower()
+    return ext if ext in current_app.extensions['allowed_extensions'] else None
+
+
+def _cursor(row) -> str:
+    """Курсор keyset-пагинации: ``<created_at ISO>_<id>``."""
+    return f"{row.created_at.isoformat()}_{row.id}"
+
+
+def _parse_cursor(raw: str) -> Optional[tuple]:
+    ts, _, addr_id = raw.rpartition('_')
+    try:
+        return datetime.fromisoformat(ts), int(addr_id)
+    except ValueError:
+        return None
 
 
 @bp.get('/addresses')
@@ -50,6 +74,15 @@ def list_addresses() -> Response:
             "total": 123
         }
 
+    Для больших списков вместо page лучше курсор: ``?after=<next_cursor>``
+    (значение из предыдущего ответа). Такая страница выбирается по индексу
+    (created_at, id) без OFFSET и без подсчёта total:
+        {
+            "items": [...],
+            "per_page": 50,
+            "next_cursor": "2026-01-02T03:04:05_123"   # null на последней
+        }
+
     Если параметров пагинации нет — поведение как раньше: возвращается
     просто список адресов.
     """
@@ -83,11 +116,14 @@ def list_addresses() -> Response:
 
     # Базовая сортировка: сначала новые (по дате создания, потом по id)
     query = query.order_by(Address.created_at.desc(), Address.id.desc())
+    # Только чтение — строки кортежами, без ORM-объектов.
+    rows_query = query.with_entities(*Address.dict_columns())
 
     # Опциональная пагинация
     page_raw = request.args.get('page')
     per_page_raw = request.args.get('per_page')
-    if page_raw or per_page_raw:
+    after_raw = (request.args.get('after') or '').strip()
+    if page_raw or per_page_raw or after_raw:
         try:
             page = int(page_raw or 1)
         except (TypeError, ValueError):
@@ -101,23 +137,45 @@ def list_addresses() -> Response:
         # Не даём сильно раздувать страницу
         per_page = min(max(per_page, 1), 500)
 
-        total = query.count()
-        items = [
-            addr.to_dict()
-            for addr in query.offset((page - 1) * per_page).limit(per_page).all()
-        ]
+        if after_raw:
+            cursor = _parse_cursor(after_raw)
+            if cursor is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            # Сравнение кортежей идёт по тому же порядку, что и ORDER BY, —
+            # поиск по индексу вместо пропуска OFFSET строк.
+            rows = rows_query.filter(tuple_(Address.created_at, Address.id) < cursor).limit(per_page + 1).all()
+            return jsonify(
+                {
+                    "items": [Address.row_to_dict(row) for row in rows[:per_page]],
+                    "per_page": per_page,
+                    "next_cursor": _cursor(rows[per_page - 1]) if len(rows) > per_page else None,
+                }
+            )
+
+        # count по самому запросу, без обёртки в подзапрос, как у query.count().
+        total = query.order_by(None).with_entities(func.count(Address.id)).scalar()
+        rows = rows_query.offset((page - 1) * per_page).limit(per_page + 1).all()
         return jsonify(
             {
-                "items": items,
+                "items": [Address.row_to_dict(row) for row in rows[:per_page]],
                 "page": page,
                 "per_page": per_page,
                 "total": total,
+                "next_cursor": _cursor(rows[per_page - 1]) if len(rows) > per_page else None,
             }
         )
 
-    # Старое поведение: вернуть все элементы списком
-    items = [addr.to_dict() for addr in query.all()]
-    return jsonify(items)
+    # Старое поведение: вернуть все элементы списком. Массив пишется в ответ
+    # по одному адресу, без промежуточных списков строк и словарей.
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield '['
+        for i, row in enumerate(rows_query.yield_per(_STREAM_BATCH)):
+            yield (',' if i else '') + dumps(Address.row_to_dict(row))
+        yield ']\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 
 @bp.post('/addresses')
@@ -151,13 +209,13 @@ def create_address() -> Response:
         # обработка загружаемого изображения
         photo_file = request.files.get('photo') or request.files.get('file')
         photo_filename: Optional[str] = None
-        if photo_file and _allowed_file(photo_file.filename):
-            ext = photo_file.filename.rsplit('.', 1)[1].lower()
-            unique_name = f"{uuid.uuid4().hex}.{ext}"
+        ext = _photo_ext(photo_file.filename) if photo_file else None
+        if ext:
+            unique_name = f"{secrets.token_hex(16)}.{ext}"
             dest_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_name)
             try:
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                photo_file.save(dest_path)
+                # Адрес ссылается на файл, только когда тот уже записан.
+                save_upload(photo_file, dest_path)
                 photo_filename = unique_name
             except Exception:
                 photo_filename = None
@@ -281,14 +339,14 @@ def update_delete_address(item_id: str) -> Response:
         remove_photo_flag = form.get('remove_photo')
         # Обработка новой фотографии
         photo_file = request.files.get('photo') or request.files.get('file')
-        if photo_file and _allowed_file(photo_file.filename):
+        ext = _photo_ext(photo_file.filename) if photo_file else None
+        if ext:
             # Сохраняем новое фото и удаляем старое (если оно было)
-            ext = photo_file.filename.rsplit('.', 1)[1].lower()
-            unique_name = f"{uuid.uuid4().hex}.{ext}"
+            unique_name = f"{secrets.token_hex(16)}.{ext}"
             dest_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_name)
             try:
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                photo_file.save(dest_path)
+                # Не записался — адрес и старое фото остаются как были.
+                save_upload(photo_file, dest_path)
                 prev = address.photo
                 address.photo = unique_name
                 # удалить старую фотографию, если изменилась
@@ -365,48 +423,74 @@ def batch_delete_addresses() -> Response:
     """Удалить несколько адресов сразу. Только администратор."""
     require_admin()
     data = request.get_json(silent=True) or {}
-    ids: List[str] = data.get('ids', [])
-    removed = 0
-    for item_id in ids:
-        address = Address.query.get(item_id)
-        if not address:
+    ids: List[int] = []
+    for item_id in data.get('ids', []):
+        try:
+            ids.append(int(item_id))
+        except (TypeError, ValueError):
             continue
-        # Проверяем доступ к зоне каждого адреса
-        if address.zone_id is not None:
-            try:
-                ensure_zone_access(address.zone_id)
-            except Exception:
-                # Если нет доступа к конкретной зоне, пропускаем этот адрес
-                continue
-        db.session.delete(address)
-        removed += 1
+    if not ids:
+        return jsonify({'deleted': 0})
+    # Один DELETE ... WHERE id IN (...) вместо SELECT + DELETE на каждый id.
+    stmt = delete(Address).where(Address.id.in_(ids))
+    # Адреса чужих зон пропускаем (как ensure_zone_access: адрес без зоны
+    # доступен всем, superadmin — без ограничений).
+    admin = get_current_admin()
+    if admin is not None and getattr(admin, 'role', None) != 'superadmin':
+        allowed = [z.id for z in admin.zones]
+        stmt = stmt.where(or_(Address.zone_id.is_(None), Address.zone_id.in_(allowed)))
+    result = db.session.execute(stmt.execution_options(synchronize_session=False))
     db.session.commit()
-    return jsonify({'deleted': removed})
+    return jsonify({'deleted': result.rowcount})
+
+
+_EXPORT_HEADER = ['id', 'name', 'lat', 'lon', 'notes', 'status', 'link', 'category']
+
+
+def _export_rows():
+    """Строки экспорта (CSV/XLSX) в порядке ``_EXPORT_HEADER``.
+
+    Выбираются только нужные колонки: строки приходят кортежами пачками
+    по ``_STREAM_BATCH``, без ORM-объектов и to_dict().
+    """
+    stmt = select(
+        Address.id,
+        Address.name,
+        Address._lat,
+        Address._lon,
+        Address.notes,
+        Address.status,
+        Address.link,
+        Address.category,
+    ).execution_options(yield_per=_STREAM_BATCH)
+    return db.session.execute(stmt)
+
+
+class _CsvLine:
+    """Псевдофайл для csv.writer: writerow возвращает готовую строку."""
+
+    def write(self, line: str) -> str:
+        return line
 
 
 @bp.get('/export')
 def export_addresses() -> Response:
-    """Экспортировать текущие адреса в CSV."""
-    items = [addr.to_dict() for addr in Address.query.all()]
-    output = StringIO()
+    """Экспортировать текущие адреса в CSV.
+
+    Файл отдаётся потоком: строки читаются из БД пачками и сразу уходят
+    в ответ.
+    """
     import csv
 
-    writer = csv.writer(output)
-    writer.writerow(['id', 'name', 'lat', 'lon', 'notes', 'status', 'link', 'category'])
-    for item in items:
-        writer.writerow([
-            item.get('id'),
-            item.get('name') or item.get('address'),
-            item.get('lat'),
-            item.get('lon'),
-            item.get('notes') or item.get('description'),
-            item.get('status'),
-            item.get('link'),
-            item.get('category'),
-        ])
-    output.seek(0)
+    writer = csv.writer(_CsvLine())
+
+    def generate():
+        yield writer.writerow(_EXPORT_HEADER)
+        for row in _export_rows():
+            yield writer.writerow(row)
+
     return Response(
-        output.read(),
+        stream_with_context(generate()),
         mimetype='text/csv',
         headers={'Content-Disposition': 'attachment; filename=addresses.csv'},
     )
@@ -419,30 +503,27 @@ def export_addresses_xlsx() -> Response:
     Создаёт таблицу со всеми полями адреса, чтобы пользователь мог
     открыть её в Excel и работать с данными напрямую.
     """
-    from openpyxl import Workbook
-    from io import BytesIO
+    try:
+        import xlsxwriter
+    except Exception as e:
+        return jsonify({'error': 'xlsxwriter not installed', 'details': str(e)}), 500
 
-    items = [addr.to_dict() for addr in Address.query.all()]
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Addresses'
-    # Заголовки столбцов
-    header = ['id', 'name', 'lat', 'lon', 'notes', 'status', 'link', 'category']
-    ws.append(header)
-    for item in items:
-        ws.append([
-            item.get('id'),
-            item.get('name') or item.get('address'),
-            item.get('lat'),
-            item.get('lon'),
-            item.get('notes') or item.get('description'),
-            item.get('status'),
-            item.get('link'),
-            item.get('category'),
-        ])
-    # Записываем файл в буфер
     buf = BytesIO()
-    wb.save(buf)
+    # constant_memory: каждая строка сразу сбрасывается во временный
+    # файл листа, в памяти держится только текущая. in_memory не
+    # включаем — он отключает constant_memory. Строки не превращаем
+    # в формулы и гиперссылки: пишем как есть.
+    wb = xlsxwriter.Workbook(buf, {
+        'constant_memory': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    ws = wb.add_worksheet('Addresses')
+    # Заголовки столбцов
+    ws.write_row(0, 0, _EXPORT_HEADER)
+    for i, row in enumerate(_export_rows(), start=1):
+        ws.write_row(i, 0, row)
+    wb.close()
     buf.seek(0)
     return Response(
         buf.getvalue(),
@@ -458,50 +539,9 @@ def import_addresses() -> Response:
     file = request.files.get('file')
     if not file:
         return jsonify({'error': 'No file provided'}), 400
-    imported = 0
     try:
         stream = StringIO(file.stream.read().decode('utf-8'))
-        import csv
-
-        reader = csv.DictReader(stream)
-        for row in reader:
-            name = (row.get('name') or row.get('address') or '').strip()
-            notes = (row.get('notes') or row.get('description') or '').strip()
-            lat = parse_coord(row.get('lat'))
-            lon = parse_coord(row.get('lon'))
-            status_str = (row.get('status') or '').strip()
-            link = (row.get('link') or '').strip()
-            category = (row.get('category') or '').strip()
-            if not in_range(lat, lon):
-                continue
-            existing_id = row.get('id')
-            if existing_id:
-                # Обновить существующую запись
-                addr = Address.query.get(existing_id)
-                if addr:
-                    addr.name = name
-                    addr.lat = lat
-                    addr.lon = lon
-                    addr.notes = notes
-                    addr.status = status_str
-                    addr.link = link
-                    addr.category = category
-                    imported += 1
-                    continue
-            # Создать новую запись
-            addr = Address(
-                name=name,
-                lat=lat,
-                lon=lon,
-                notes=notes,
-                status=status_str,
-                link=link,
-                category=category,
-            )
-            db.session.add(addr)
-            imported += 1
-        db.session.commit()
-        return jsonify({'imported': imported}), 200
+        return jsonify(import_addresses_from_csv(stream)), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -12,13 +12,19 @@
 from datetime import datetime, timedelta
 from typing import Any, Dict, List
 
-from flask import request, jsonify
+from flask import current_app, request, jsonify
+from sqlalchemy import func
 
-from ..extensions import db
-from ..models import Address, PendingMarker, PendingHistory
+from ..extensions import db, get_redis
+from ..models import ADMIN_SUMMARY_KEY, Address, PendingMarker, PendingHistory
 
 from . import bp
 
+# Кэш ответа /summary в Redis. Дашборд опрашивает его постоянно, а данные
+# меняются редко: пять COUNT считаются не чаще раза в TTL. Ключ сбрасывается
+# при коммите, меняющем адреса или заявки (см. конец app/models.py).
+_SUMMARY_TTL_SEC = 15
+
 
 @bp.get('/summary')
 def admin_summary():
@@ -37,6 +43,16 @@ def admin_summary():
       }
     }
     """
+    r = get_redis()
+    if r is not None:
+        try:
+            cached = r.get(ADMIN_SUMMARY_KEY)
+        except Exception:
+            cached = None
+        if cached:
+            # Готовый JSON из кэша — без запросов к БД и сериализации.
+            return current_app.response_class(cached, mimetype='application/json')
+
     # Количество ожидающих заявок (pending)
     active = PendingMarker.query.count()
     # Количество одобренных заявок — считаем записи истории со статусом 'approved'
@@ -48,7 +64,7 @@ def admin_summary():
     new_last_7d = Address.query.filter(Address.created_at >= cutoff).count()
     # Общее количество адресов
     total_addresses = Address.query.count()
-    return jsonify({
+    body = current_app.json.dumps({
         'applications': {
             'active': active,
             'approved': approved,
@@ -59,6 +75,12 @@ def admin_summary():
             'total': total_addresses,
         }
     })
+    if r is not None:
+        try:
+            r.setex(ADMIN_SUMMARY_KEY, _SUMMARY_TTL_SEC, body)
+        except Exception:
+            pass
+    return current_app.response_class(body, mimetype='application/json')
 
 
 @bp.get('/addresses')
@@ -68,11 +90,14 @@ def admin_addresses():
     Параметры запроса:
     - page: номер страницы (по умолчанию 1)
     - limit: количество элементов на странице (по умолчанию 10)
+    - after: id последнего адреса предыдущей страницы (next_cursor); если
+      задан, страница выбирается по индексу без OFFSET, а page игнорируется
 
     Формат ответа:
     {
       "items": [<address_dict>, ...],
-      "total": <int>
+      "total": <int>,
+      "next_cursor": <int | null>
     }
     """
     try:
@@ -83,14 +108,23 @@ def admin_addresses():
         limit = int(request.args.get('limit', 10))
     except Exception:
         limit = 10
+    try:
+        after = int(request.args.get('after') or 0)
+    except Exception:
+        after = 0
     page = max(1, page)
     limit = max(1, limit)
-    query = Address.query
-    total = query.count()
-    items = query.order_by(Address.id.desc()).offset((page - 1) * limit).limit(limit).all()
+    total = db.session.query(func.count(Address.id)).scalar()
+    query = Address.query.with_entities(*Address.dict_columns()).order_by(Address.id.desc())
+    if after > 0:
+        query = query.filter(Address.id < after)
+    else:
+        query = query.offset((page - 1) * limit)
+    items = query.limit(limit + 1).all()
     return jsonify({
-        'items': [addr.to_dict() for addr in items],
-        'total': total
+        'items': [Address.row_to_dict(row) for row in items[:limit]],
+        'total': total,
+        'next_cursor': items[limit - 1].id if len(items) > limit else None,
     })
 
 
@@ -132,25 +166,32 @@ def admin_applications():
     # approved or rejected: читаем историю
     hist_query = PendingHistory.query.filter(PendingHistory.status == status).order_by(PendingHistory.id.desc())
     total = hist_query.count()
-    hist_items = hist_query.limit(limit).all()
+    # Адреса одобренных заявок — тем же запросом (LEFT JOIN), а не
+    # отдельным SELECT на каждую запись истории.
+    hist_items = (
+        db.session.query(PendingHistory, Address)
+        .outerjoin(Address, Address.id == PendingHistory.address_id)
+        .filter(PendingHistory.status == status)
+        .order_by(PendingHistory.id.desc())
+        .limit(limit)
+        .all()
+    )
     out: List[Dict[str, Any]] = []
-    for rec in hist_items:
+    for rec, addr in hist_items:
         item: Dict[str, Any] = {
             'id': rec.pending_id,
             'status': rec.status,
             'timestamp': rec.timestamp.isoformat() if rec.timestamp else None,
         }
         # Для одобренных заявок пытаемся получить данные адреса
-        if rec.status == 'approved' and rec.address_id:
-            addr = Address.query.get(rec.address_id)
-            if addr:
-                item['name'] = addr.name
-                item['lat'] = addr.lat
-                item['lon'] = addr.lon
-                item['category'] = addr.category
-                item['link'] = addr.link
-                item['notes'] = addr.notes
-                item['address_id'] = addr.id
+        if rec.status == 'approved' and addr:
+            item['name'] = addr.name
+            item['lat'] = addr.lat
+            item['lon'] = addr.lon
+            item['category'] = addr.category
+            item['link'] = addr.link
+            item['notes'] = addr.notes
+            item['address_id'] = addr.id
         out.append(item)
     return jsonify({
         'applications': out,
@@ -172,17 +213,22 @@ def admin_application_detail(pid: int):
     if pm:
         return jsonify(pm.to_dict())
     # Ищем запись в истории
-    hist = PendingHistory.query.filter(PendingHistory.pending_id == pid).order_by(PendingHistory.id.desc()).first()
-    if not hist:
+    row = (
+        db.session.query(PendingHistory, Address)
+        .outerjoin(Address, Address.id == PendingHistory.address_id)
+        .filter(PendingHistory.pending_id == pid)
+        .order_by(PendingHistory.id.desc())
+        .first()
+    )
+    if not row:
         return jsonify({'error': 'not found'}), 404
+    hist, addr = row
     item: Dict[str, Any] = {
         'id': hist.pending_id,
         'status': hist.status,
         'timestamp': hist.timestamp.isoformat() if hist.timestamp else None,
     }
     # Если заявка была одобрена, пытаемся вернуть адрес
-    if hist.status == 'approved' and hist.address_id:
-        addr = Address.query.get(hist.address_id)
-        if addr:
-            item['address'] = addr.to_dict()
+    if hist.status == 'approved' and addr:
+        item['address'] = addr.to_dict()
     return jsonify(item)
\ No newline at end of file
@@ -1,5 +1,13 @@
 """Middlewares for aiogram 3 bot."""
 
-from .logging import LoggingMiddleware
-
 __all__ = ["LoggingMiddleware"]
+
+
+def __getattr__(name):
+    # aiogram импортируется секунды. Flask-приложение берёт из пакета только
+    # telegram_webapp_security, поэтому aiogram грузим лишь для bot.py.
+    if name == "LoggingMiddleware":
+        from .logging import LoggingMiddleware
+
+        return LoggingMiddleware
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -17,7 +17,6 @@ from threading import Thread
 from typing import Any, Dict, List, Optional
 
 import requests
-from openai import OpenAI
 from flask import Response, jsonify, request, current_app, render_template, g
 
 from sqlalchemy.exc import OperationalError
@@ -132,6 +131,9 @@ def bot_voice_camera_submit() -> Response:
             audio_file.save(tmp.name)
             temp_path = tmp.name
 
+        # openai импортируется ~0.6 с — только здесь, а не при старте приложения.
+        from openai import OpenAI
+
         client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         with open(temp_path, 'rb') as af:
             transcript = client.audio.transcriptions.create(
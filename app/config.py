@@ -281,6 +281,13 @@ class Config:
     SCHEDULER_LOCK_KEY = os.environ.get("SCHEDULER_LOCK_KEY", "mapv12:schedulers:lock")
     SCHEDULER_LOCK_TTL_SEC = int(os.environ.get("SCHEDULER_LOCK_TTL_SEC", 60))
 
+    # --- Схема БД ---
+    # db.create_all() при старте процесса: удобно для dev/тестов, но это
+    # интроспекция и DDL по каждой модели на каждый запуск воркера.
+    # Включён и в проде: часть таблиц пока создаёт только create_all
+    # (список — alembic/TODO.md).
+    CREATE_ALL_ON_BOOT = os.environ.get("CREATE_ALL_ON_BOOT", "1") == "1"
+
 
 
 class DevelopmentConfig(Config):
@@ -22,9 +22,29 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy.types import TypeDecorator
+
 from ..extensions import db
 
 
+class ChatId(TypeDecorator):
+    """UUID-идентификатор chat2 в виде строки.
+
+    В PostgreSQL хранится нативным ``uuid`` (16 байт вместо 36 символов —
+    вдвое меньше индексы и сравнения в JOIN), в остальных СУБД —
+    ``String(36)``. В приложении значение всегда строка. Строки от клиента
+    проверяют маршруты (не UUID — 400), тип их не переписывает.
+    """
+
+    impl = db.String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(db.Uuid(as_uuid=False))
+        return dialect.type_descriptor(db.String(36))
+
+
 class Channel(db.Model):
     """Канал общения.
 
@@ -36,7 +56,7 @@ class Channel(db.Model):
     """
 
     __tablename__ = "chat2_channels"
-    id: str = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: str = db.Column(ChatId(), primary_key=True, default=lambda: str(uuid.uuid4()))
     type: str = db.Column(db.String(16), nullable=False)
     shift_id: Optional[int] = db.Column(db.Integer, nullable=True)
     marker_id: Optional[int] = db.Column(db.Integer, nullable=True)
@@ -60,8 +80,8 @@ class Message(db.Model):
     """
 
     __tablename__ = "chat2_messages"
-    id: str = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    channel_id: str = db.Column(db.String(36), db.ForeignKey("chat2_channels.id"), nullable=False)
+    id: str = db.Column(ChatId(), primary_key=True, default=lambda: str(uuid.uuid4()))
+    channel_id: str = db.Column(ChatId(), db.ForeignKey("chat2_channels.id"), nullable=False)
     sender_type: str = db.Column(db.String(16), nullable=False)
     sender_id: str = db.Column(db.String(64), nullable=False)
     client_msg_id: Optional[str] = db.Column(db.String(64), nullable=True)
@@ -122,10 +142,10 @@ class ChannelMember(db.Model):
 
     __tablename__ = "chat2_members"
     id = db.Column(db.Integer, primary_key=True)
-    channel_id: str = db.Column(db.String(36), db.ForeignKey("chat2_channels.id"), nullable=False)
+    channel_id: str = db.Column(ChatId(), db.ForeignKey("chat2_channels.id"), nullable=False)
     member_type: str = db.Column(db.String(16), nullable=False)
     member_id: str = db.Column(db.String(64), nullable=False)
-    last_read_message_id: Optional[str] = db.Column(db.String(36), nullable=True)
+    last_read_message_id: Optional[str] = db.Column(ChatId(), nullable=True)
     last_read_at = db.Column(db.DateTime, nullable=True)
 
     __table_args__ = (
@@ -49,6 +49,21 @@ def _get_current_user() -> tuple[str, str]:
     abort(403)
 
 
+def _invalid_chat_id(**ids: Optional[str]):
+    """400-ответ, если переданный идентификатор chat2 — не UUID, иначе None.
+
+    Ключи каналов и сообщений — UUID (в PostgreSQL — тип ``uuid``):
+    мусор от клиента отклоняем здесь, а не на приведении типа в БД.
+    """
+    for name, value in ids.items():
+        if not value:
+            continue
+        try:
+            uuid.UUID(str(value))
+        except ValueError:
+            return jsonify({"error": f"invalid {name}"}), 400
+    return None
+
 
 def _unread_count_for_member(channel_id: str, member_type: str, member_id: str, *, exclude_self: bool = True) -> int:
     """Подсчитать непрочитанные сообщения для участника канала.
@@ -145,6 +160,9 @@ def api_chat_send():
         return jsonify({"error": "channel_id is required"}), 400
     if kind == "text" and not text:
         return jsonify({"error": "text is required"}), 400
+    bad = _invalid_chat_id(channel_id=channel_id)
+    if bad:
+        return bad
     channel = Channel.query.filter_by(id=channel_id).first()
     if not channel:
         return jsonify({"error": "channel not found"}), 404
@@ -240,6 +258,9 @@ def api_chat_history():
     except Exception:
         limit = 50
     before_id = request.args.get("before_id")
+    bad = _invalid_chat_id(channel_id=channel_id, before_id=before_id)
+    if bad:
+        return bad
     q = Message.query.filter_by(channel_id=channel_id)
     if before_id:
         ref = Message.query.filter_by(id=before_id, channel_id=channel_id).first()
@@ -270,6 +291,9 @@ def api_chat_sync():
     except Exception:
         limit = 200
     after_id = request.args.get("after_id")
+    bad = _invalid_chat_id(channel_id=channel_id, after_id=after_id)
+    if bad:
+        return bad
     q = Message.query.filter_by(channel_id=channel_id)
     if after_id:
         ref = Message.query.filter_by(id=after_id, channel_id=channel_id).first()
@@ -295,6 +319,9 @@ def api_chat_mark_read():
     last_id: str = str(payload.get("last_read_message_id") or "").strip()
     if not channel_id or not last_id:
         return jsonify({"error": "channel_id and last_read_message_id are required"}), 400
+    bad = _invalid_chat_id(channel_id=channel_id, last_read_message_id=last_id)
+    if bad:
+        return bad
     channel = Channel.query.filter_by(id=channel_id).first()
     if not channel:
         return jsonify({"error": "channel not found"}), 404
@@ -330,6 +357,9 @@ def api_chat_receipt():
     rec_type: str = str(payload.get("type") or "").strip().lower()
     if not channel_id or not message_id or not rec_type:
         return jsonify({"error": "channel_id, message_id and type are required"}), 400
+    bad = _invalid_chat_id(channel_id=channel_id, message_id=message_id)
+    if bad:
+        return bad
     # Проверяем канал и сообщение
     channel = Channel.query.filter_by(id=channel_id).first()
     if not channel:
@@ -395,6 +425,9 @@ def api_chat_upload_media():
     file = request.files["file"]
     if file.filename == "":
         return jsonify({"error": "file must have a name"}), 400
+    bad = _invalid_chat_id(channel_id=channel_id)
+    if bad:
+        return bad
     channel = Channel.query.filter_by(id=channel_id).first()
     if not channel:
         return jsonify({"error": "channel not found"}), 404
@@ -506,6 +539,9 @@ def api_chat_search():
         return jsonify({"error": "channel_id is required"}), 400
     if not qtext:
         return jsonify({"error": "query is required"}), 400
+    bad = _invalid_chat_id(channel_id=channel_id)
+    if bad:
+        return bad
     try:
         limit = int(request.args.get("limit") or 50)
     except Exception:
@@ -537,6 +573,9 @@ def api_chat_send_template():
     template_id: str = str(payload.get("template_id") or "").strip()
     if not channel_id or not template_id:
         return jsonify({"error": "channel_id and template_id are required"}), 400
+    bad = _invalid_chat_id(channel_id=channel_id)
+    if bad:
+        return bad
     channel = Channel.query.filter_by(id=channel_id).first()
     if not channel:
         return jsonify({"error": "channel not found"}), 404
@@ -9,10 +9,17 @@
 
 from __future__ import annotations
 
+from typing import Any, Dict, Optional
+
 from celery import Celery
-from flask import Flask
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
 
+try:
+    import redis
+except Exception:  # pragma: no cover
+    redis = None  # type: ignore
+
 # Инициализируем объект SQLAlchemy без привязки к конкретному приложению.
 # Приложение привязывается в create_app() (см. app/__init__.py).
 db = SQLAlchemy()
@@ -39,3 +46,25 @@ def init_celery(app: Flask) -> Celery:
 
     celery_app.Task = FlaskTask
     return celery_app
+
+
+# Клиенты Redis по URL: один пул соединений на процесс, а не на вызов.
+_redis_clients: Dict[str, Any] = {}
+
+
+def get_redis() -> Optional[Any]:
+    """Общий клиент Redis по ``REDIS_URL`` из конфига.
+
+    Возвращает None, если Redis не настроен или пакет redis не установлен.
+    Соединение открывается при первой команде; ошибки обрабатывает
+    вызывающий код (Redis здесь — необязательный кэш).
+    """
+    url = (current_app.config.get("REDIS_URL") or "").strip()
+    if not url or redis is None:
+        return None
+    client = _redis_clients.get(url)
+    if client is None:
+        # Короткие таймауты: недоступный Redis не должен подвешивать запрос.
+        client = redis.Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        _redis_clients[url] = client
+    return client
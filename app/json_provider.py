@@ -0,0 +1,58 @@
+"""JSON-провайдер Flask на orjson.
+
+``jsonify`` и ``app.json.response`` сериализуют через orjson (C/Rust), а не
+через стандартный ``json``: на больших списках (адреса, заявки) это основная
+доля CPU ответа. Вывод совместим с DefaultJSONProvider: ключи сортируются,
+нестроковые ключи приводятся к строкам, datetime/date идут в
+``DefaultJSONProvider.default`` (RFC 822, как раньше).
+
+Если orjson не установлен или объект ему не по силам (например, int шире
+64 бит), используется стандартная реализация.
+"""
+
+from __future__ import annotations
+
+import typing as t
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson не установлен
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider, который сериализует через orjson."""
+
+    # orjson всегда пишет UTF-8; так же ведёт себя и запасной путь.
+    ensure_ascii = False
+
+    def _orjson_dumps(self, obj: t.Any, indent: bool = False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        # Произвольные параметры json.dumps orjson не понимает.
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._orjson_dumps(obj).decode("utf-8")
+        except orjson.JSONEncodeError:
+            return super().dumps(obj)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            # Байты сразу в тело ответа — без decode/encode строки.
+            body = self._orjson_dumps(obj, indent=indent)
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -22,13 +22,14 @@ except Exception:  # pragma: no cover - fallback for environments without GeoAlc
         def get_col_spec(self, **kw):
             return "GEOMETRY"
 
-from sqlalchemy import func
+from sqlalchemy import event, func
 from sqlalchemy import UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.orm import Session, object_session
 
-from .extensions import db
+from .extensions import db, get_redis
 
 
 from datetime import datetime, timezone
@@ -98,8 +99,11 @@ class Address(db.Model):
     __table_args__ = (
         # Индекс по категории и статусу для быстрых фильтров на карте
         db.Index('ix_addresses_category_status', 'category', 'status'),
-        # Индекс по дате создания для сортировки и аналитики
-        db.Index('ix_addresses_created_at', 'created_at'),
+        # Сортировка и курсор списка адресов: (created_at, id); он же
+        # обслуживает выборки по одной дате создания (аналитика)
+        db.Index('ix_addresses_created_id', 'created_at', 'id'),
+        # Ограничение по зонам админа и фильтр по статусу
+        db.Index('ix_addresses_zone_status', 'zone_id', 'status'),
     )
     id: int = db.Column(db.Integer, primary_key=True)
     name: str = db.Column(db.String(255), nullable=False, default='')
@@ -115,7 +119,7 @@ class Address(db.Model):
     photo: str = db.Column(db.String(128), nullable=True)
     ai_tags = db.Column(db.JSON().with_variant(JSONB, 'postgresql'), nullable=True)
     priority = db.Column(db.Integer, nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
     @hybrid_property
@@ -148,21 +152,43 @@ class Address(db.Model):
 
     def to_dict(self) -> Dict[str, Any]:
         """Преобразовать запись в словарь для JSON‑выдачи."""
+        # Тот же набор полей, что у выборок кортежами: форма словаря задаётся
+        # в одном месте — row_to_dict.
+        return self.row_to_dict(tuple(getattr(self, col.key) for col in self.dict_columns()))
+
+    @classmethod
+    def dict_columns(cls) -> tuple:
+        """Колонки словаря адреса в порядке row_to_dict().
+
+        Списки адресов читают строки без ORM-объектов: без identity map,
+        отслеживания изменений и selectin-загрузки zone.
+        """
+        return (
+            cls.id, cls.name, cls._lat, cls._lon, cls.notes, cls.status, cls.link,
+            cls.category, cls.zone_id, cls.photo, cls.ai_tags, cls.priority,
+            cls.created_at, cls.updated_at,
+        )
+
+    @staticmethod
+    def row_to_dict(row) -> Dict[str, Any]:
+        """Словарь адреса для JSON‑выдачи из строки по dict_columns()."""
+        (addr_id, name, lat, lon, notes, status, link, category,
+         zone_id, photo, ai_tags, priority, created_at, updated_at) = row
         return {
-            'id': self.id,
-            'name': self.name,
-            'lat': self.lat,
-            'lon': self.lon,
-            'notes': self.notes,
-            'status': self.status,
-            'link': self.link,
-            'category': self.category,
-            'zone_id': self.zone_id,
-            'photo': self.photo,
-            'ai_tags': self.ai_tags or [],
-            'priority': self.priority,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'id': addr_id,
+            'name': name,
+            'lat': lat,
+            'lon': lon,
+            'notes': notes,
+            'status': status,
+            'link': link,
+            'category': category,
+            'zone_id': zone_id,
+            'photo': photo,
+            'ai_tags': ai_tags or [],
+            'priority': priority,
+            'created_at': created_at.isoformat() if created_at else None,
+            'updated_at': updated_at.isoformat() if updated_at else None,
         }
 
 
@@ -1668,3 +1694,52 @@ class AdminAuditLog(db.Model):
             'action': self.action,
             'payload': self.payload or {},
         }
+
+
+# --- Сброс кэша /admin/summary ---
+# Ответ /admin/summary кэшируется в Redis (app/admin/routes.py). Коммит,
+# меняющий адреса или заявки, сбрасывает ключ. Слушатели висят на мапперах
+# этих трёх моделей: flush остальных таблиц (точки трекера, чат) их не
+# вызывает.
+ADMIN_SUMMARY_KEY = 'admin:summary'
+_SUMMARY_MODELS = (Address, PendingMarker, PendingHistory)
+_SUMMARY_TABLES = frozenset(m.__tablename__ for m in _SUMMARY_MODELS)
+
+
+def _mark_summary_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info['admin_summary_dirty'] = True
+
+
+for _model in _SUMMARY_MODELS:
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _mark_summary_dirty)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_summary_dirty_bulk(orm_execute_state) -> None:
+    # Массовые INSERT/UPDATE/DELETE через session.execute() (delete(Address),
+    # executemany импорта) идут мимо flush и событий маппера.
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, 'table', None)
+        if getattr(table, 'name', None) in _SUMMARY_TABLES:
+            state.session.info['admin_summary_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_summary_cache(session) -> None:
+    if not session.info.pop('admin_summary_dirty', False):
+        return
+    try:
+        r = get_redis()
+        if r is not None:
+            r.delete(ADMIN_SUMMARY_KEY)
+    except Exception:
+        pass
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_summary_dirty(session) -> None:
+    session.info.pop('admin_summary_dirty', None)
@@ -11,7 +11,7 @@ import asyncio
 import json
 import os
 from datetime import datetime, timezone
-from typing import Any, Awaitable, Callable, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 try:
     import redis.asyncio as redis_async
@@ -20,6 +20,11 @@ except Exception:  # pragma: no cover
     redis_async = None  # type: ignore[assignment]
     Redis = None  # type: ignore[assignment]
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 DEFAULT_CHANNEL = "map_updates"
 DEFAULT_TELEMETRY_QUEUE = "telemetry_save_queue"
@@ -50,6 +55,16 @@ def get_channel() -> str:
     return (os.getenv("REALTIME_REDIS_CHANNEL") or DEFAULT_CHANNEL).strip() or DEFAULT_CHANNEL
 
 
+def _dumps(payload: Dict[str, Any]):
+    """Тело сообщения Pub/Sub: orjson (bytes), если установлен, иначе json."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(payload, ensure_ascii=False)
+
+
 def _parse_ts(raw: Any) -> datetime:
     if raw is None:
         return datetime.now(timezone.utc)
@@ -112,7 +127,7 @@ class RedisBroker:
         if client is None:
             return False
 
-        body = json.dumps(payload, ensure_ascii=False)
+        body = _dumps(payload)
         try:
             client.publish(channel, body)
             return True
@@ -126,6 +141,33 @@ class RedisBroker:
             except Exception:
                 return False
 
+    def publish_events(self, channel: str, payloads: List[Dict[str, Any]]) -> bool:
+        """Publish several payloads into channel in one round-trip (pipeline)."""
+        if len(payloads) <= 1:
+            return all(self.publish_event(channel, payload) for payload in payloads)
+        client = self._get_sync_client()
+        if client is None:
+            return False
+
+        bodies = [_dumps(payload) for payload in payloads]
+        for attempt in range(2):
+            try:
+                # transaction=False: без MULTI/EXEC, просто пачка PUBLISH.
+                pipe = client.pipeline(transaction=False)
+                for body in bodies:
+                    pipe.publish(channel, body)
+                pipe.execute()
+                return True
+            except Exception:
+                if attempt:
+                    return False
+                # В случае stale-соединения пробуем 1 re-connect и повтор.
+                try:
+                    client = self._sync_client = Redis.from_url(self.redis_url, decode_responses=True)
+                except Exception:
+                    return False
+        return False
+
     async def listener(
         self,
         channel: str,
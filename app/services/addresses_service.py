@@ -14,7 +14,7 @@ from io import StringIO
 from typing import Any, Dict, List, Optional, Tuple
 
 from flask import current_app
-from sqlalchemy import or_
+from sqlalchemy import bindparam, func, or_, select
 
 from ..extensions import db
 from ..models import Address
@@ -127,16 +127,64 @@ def export_addresses_csv() -> str:
     return output.getvalue()
 
 
+# Строк CSV на один executemany при импорте.
+_IMPORT_CHUNK = 1000
+
+
+def _import_statements(with_geom: bool):
+    """INSERT и UPDATE (по ``b_id``) для executemany при импорте.
+
+    ``with_geom`` (PostgreSQL): geom вычисляется в том же запросе из
+    параметров geom_lat/geom_lon — как это делают сеттеры Address.lat/lon
+    для одиночных записей.
+    """
+    table = Address.__table__
+    insert_stmt = table.insert()
+    update_stmt = table.update().where(table.c.id == bindparam('b_id'))
+    if with_geom:
+        geom = func.ST_SetSRID(func.ST_MakePoint(bindparam('geom_lon'), bindparam('geom_lat')), 4326)
+        insert_stmt = insert_stmt.values(geom=geom)
+        update_stmt = update_stmt.values(geom=geom)
+    return insert_stmt, update_stmt
+
+
+def _import_chunk(chunk: List[Tuple[Optional[int], Dict[str, Any]]], statements) -> None:
+    insert_stmt, update_stmt = statements
+    ids = {addr_id for addr_id, _values in chunk if addr_id is not None}
+    existing = set()
+    if ids:
+        # Какие id уже есть — одним запросом на пачку, а не get() на строку.
+        existing = set(db.session.execute(select(Address.id).where(Address.id.in_(ids))).scalars())
+    new_rows: List[Dict[str, Any]] = []
+    update_rows: List[Dict[str, Any]] = []
+    for addr_id, values in chunk:
+        if addr_id in existing:
+            update_rows.append({'b_id': addr_id, **values})
+        else:
+            new_rows.append(values)
+    if new_rows:
+        db.session.execute(insert_stmt, new_rows)
+    if update_rows:
+        db.session.execute(update_stmt, update_rows)
+
+
 def import_addresses_from_csv(stream) -> Dict[str, Any]:
     """Импортировать адреса из CSV‑потока.
 
     Аргумент ``stream`` должен предоставлять метод ``read()`` и
     возвращать строку CSV (например, объект StringIO).
+
+    Строки с id существующего адреса обновляют его, остальные создают
+    новые адреса. Запись идёт пачками по ``_IMPORT_CHUNK`` строк: один
+    executemany на INSERT и один на UPDATE, без ORM-объектов на строку.
     """
     import csv
 
     reader = csv.DictReader(stream)
     imported = 0
+    with_geom = db.session.get_bind().dialect.name == 'postgresql'
+    statements = _import_statements(with_geom)
+    chunk: List[Tuple[Optional[int], Dict[str, Any]]] = []
 
     for row in reader:
         name = (row.get('name') or row.get('address') or '').strip()
@@ -150,33 +198,29 @@ def import_addresses_from_csv(stream) -> Dict[str, Any]:
         if not in_range(lat, lon):
             continue
 
-        existing_id = row.get('id')
-        if existing_id:
-            addr = Address.query.get(existing_id)
-        else:
-            addr = None
-
-        if addr is None:
-            addr = Address(
-                name=name,
-                lat=lat,
-                lon=lon,
-                notes=notes,
-                status=status_str,
-                link=link,
-                category=category,
-            )
-            db.session.add(addr)
-        else:
-            addr.name = name
-            addr.lat = lat
-            addr.lon = lon
-            addr.notes = notes
-            addr.status = status_str
-            addr.link = link
-            addr.category = category
-
+        try:
+            existing_id = int(row.get('id') or 0) or None
+        except (TypeError, ValueError):
+            existing_id = None
+
+        values = {
+            'name': name,
+            'lat': lat,
+            'lon': lon,
+            'notes': notes,
+            'status': status_str,
+            'link': link,
+            'category': category,
+        }
+        if with_geom:
+            values.update(geom_lat=lat, geom_lon=lon)
+        chunk.append((existing_id, values))
         imported += 1
+        if len(chunk) >= _IMPORT_CHUNK:
+            _import_chunk(chunk, statements)
+            chunk = []
 
+    if chunk:
+        _import_chunk(chunk, statements)
     db.session.commit()
     return {'imported': imported}
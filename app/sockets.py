@@ -26,11 +26,12 @@
 
 import asyncio
 import json
-from typing import Dict, Any, Set, Optional
+from typing import Dict, Any, List, Set, Optional, Tuple
 
 from urllib.parse import urlparse, parse_qs
 
 import websockets
+from flask import after_this_request, g, has_request_context
 
 from .realtime.tokens import verify_token
 
@@ -209,32 +210,57 @@ def broadcast_event_sync(event: str, data: Dict[str, Any]) -> None:
     2) Иначе (или при ошибке Redis) — шлём локально: ASGI hub и/или
        standalone WS сервер (websockets).
 
+    Внутри HTTP-запроса события копятся и уходят одной пачкой, когда ответ
+    уже сформирован (после commit обработчика): один pipeline в Redis
+    вместо PUBLISH на событие — например, на каждую точку трека.
+
     :param event: имя события
     :param data: словарь с данными
     """
-    global ws_loop
+    if has_request_context():
+        pending = g.get('_pending_broadcasts')
+        if pending is None:
+            pending = g._pending_broadcasts = []
+            after_this_request(_flush_pending_broadcasts)
+        pending.append((event, data))
+        return
+    _deliver_events([(event, data)])
+
+
+def _flush_pending_broadcasts(response):
+    pending = g.pop('_pending_broadcasts', None)
+    if pending:
+        _deliver_events(pending)
+    return response
 
+
+def _deliver_events(events: List[Tuple[str, Dict[str, Any]]]) -> None:
     # Redis Pub/Sub (межпроцессная доставка)
     try:
         from .realtime.broker import get_broker
 
-        payload = {'event': event, 'data': data}
-        if get_broker().publish_event('map_updates', payload):
+        broker = get_broker()
+        payloads = [{'event': event, 'data': data} for event, data in events]
+        if len(payloads) == 1:
+            published = broker.publish_event('map_updates', payloads[0])
+        else:
+            published = broker.publish_events('map_updates', payloads)
+        if published:
             return
     except Exception:
         pass
 
-    # ASGI hub (если приложение запущено через asgi_realtime)
-    try:
-        from .realtime.hub import broadcast_sync as asgi_broadcast
-        asgi_broadcast(event, data)
-    except Exception:
-        pass
+    for event, data in events:
+        # ASGI hub (если приложение запущено через asgi_realtime)
+        try:
+            from .realtime.hub import broadcast_sync as asgi_broadcast
+            asgi_broadcast(event, data)
+        except Exception:
+            pass
 
-    # Standalone WS server (websockets) — если запущен в этом процессе
-    if ws_loop is None:
-        return
-    asyncio.run_coroutine_threadsafe(_broadcast(event, data), ws_loop)
+        # Standalone WS server (websockets) — если запущен в этом процессе
+        if ws_loop is not None:
+            asyncio.run_coroutine_threadsafe(_broadcast(event, data), ws_loop)
 
 
 def start_socket_server(
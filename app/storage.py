@@ -8,11 +8,13 @@
 """
 
 import json
+import logging
 import os
 from typing import Any, Dict, List, Optional, Tuple
 
 from flask import current_app
 
+logger = logging.getLogger(__name__)
 
 def load_addresses() -> Tuple[List[Dict[str, Any]], int]:
     """
@@ -115,3 +117,24 @@ def save_pending_history(history: Dict[str, Any]) -> None:
             json.dump(history, fh, ensure_ascii=False, indent=2)
     except Exception:
         pass
+
+
+def save_upload(file_storage, dest_path: str) -> None:
+    """Сохранить загруженный файл под ``dest_path``.
+
+    Файл пишется потоково во временный ``.part`` и переименовывается,
+    когда записан целиком: под итоговым именем недописанного файла не
+    бывает. При ошибке ``.part`` удаляется, исключение пробрасывается.
+    """
+    tmp_path = dest_path + ".part"
+    try:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        file_storage.save(tmp_path)
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        logger.exception("upload write failed: %s", dest_path)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -6,8 +6,6 @@ import json
 import os
 from typing import Any
 
-from openai import OpenAI
-
 from .extensions import celery_app, db
 from .models import PendingMarker
 from .realtime.broker import get_broker
@@ -16,6 +14,10 @@ from .realtime.broker import get_broker
 @celery_app.task(bind=True)
 def process_voice_incident(self, file_path: str, agent_id: int) -> dict[str, Any]:
     """Обработать голосовой инцидент в фоне (Whisper + GPT + DB + Redis push)."""
+    # openai импортируется ~0.6 с: модуль задач грузит и веб-процесс
+    # (через voice_service), а клиент нужен только воркеру.
+    from openai import OpenAI
+
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
     try:
@@ -362,6 +362,29 @@ def _require_device() -> Tuple[Optional[TrackerDevice], Optional[Tuple[Any, int]
     return dev, None
 
 
+def _upsert_device_health(values: Dict[str, Any]) -> None:
+    """Записать последнее состояние устройства одним statement'ом.
+
+    Postgres/SQLite: INSERT ... ON CONFLICT (device_id) DO UPDATE вместо
+    SELECT + INSERT/UPDATE на каждый health-пинг. Прочие диалекты — merge().
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        db.session.merge(TrackerDeviceHealth(**values))
+        return
+
+    stmt = insert(TrackerDeviceHealth.__table__).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["device_id"],
+        set_={k: stmt.excluded[k] for k in values if k != "device_id"},
+    )
+    db.session.execute(stmt)
+
+
 @bp.post("/api/tracker/health")
 def api_health():
     """Health/heartbeat от приложения.
@@ -430,40 +453,35 @@ def api_health():
         except Exception:
             return None
 
-    row = TrackerDeviceHealth.query.filter_by(device_id=dev.public_id).first()
-    if not row:
-        row = TrackerDeviceHealth(device_id=dev.public_id, user_id=dev.user_id)
-        db.session.add(row)
-
-    row.user_id = dev.user_id
-    row.updated_at = _utcnow()
-
-    row.battery_pct = _int(data.get("battery_pct"))
-    row.is_charging = _bool(data.get("is_charging"))
-
-    row.net = (data.get("net") or "").strip()[:16] or None
-    row.gps = (data.get("gps") or "").strip()[:16] or None
-
-    row.accuracy_m = _float(data.get("accuracy_m"))
-    row.queue_size = _int(data.get("queue_size"))
-    row.tracking_on = _bool(data.get("tracking_on"))
-
-    row.last_send_at = _dt(data.get("last_send_at"))
-    if row.last_send_at is None:
-        # Если клиент не прислал last_send_at, считаем что "последняя отправка" = последний heartbeat.
-        row.last_send_at = row.updated_at
-
-    row.last_error = (data.get("last_error") or "").strip()[:256] or None
-
-    row.app_version = (data.get("app_version") or "").strip()[:32] or None
-    row.device_model = (data.get("device_model") or "").strip()[:64] or None
-    row.os_version = (data.get("os_version") or "").strip()[:32] or None
-
+    now = _utcnow()
     extra = data.get("extra")
     try:
-        row.extra_json = json.dumps(extra, ensure_ascii=False) if isinstance(extra, dict) else None
+        extra_json = json.dumps(extra, ensure_ascii=False) if isinstance(extra, dict) else None
     except Exception:
-        row.extra_json = None
+        extra_json = None
+
+    values = {
+        "device_id": dev.public_id,
+        "user_id": dev.user_id,
+        "updated_at": now,
+        "battery_pct": _int(data.get("battery_pct")),
+        "is_charging": _bool(data.get("is_charging")),
+        "net": (data.get("net") or "").strip()[:16] or None,
+        "gps": (data.get("gps") or "").strip()[:16] or None,
+        "accuracy_m": _float(data.get("accuracy_m")),
+        "queue_size": _int(data.get("queue_size")),
+        "tracking_on": _bool(data.get("tracking_on")),
+        # Если клиент не прислал last_send_at, считаем что "последняя отправка" = последний heartbeat.
+        "last_send_at": _dt(data.get("last_send_at")) or now,
+        "last_error": (data.get("last_error") or "").strip()[:256] or None,
+        "app_version": (data.get("app_version") or "").strip()[:32] or None,
+        "device_model": (data.get("device_model") or "").strip()[:64] or None,
+        "os_version": (data.get("os_version") or "").strip()[:32] or None,
+        "extra_json": extra_json,
+    }
+    _upsert_device_health(values)
+    # transient-объект только для to_dict()/broadcast, в сессию не добавляется
+    row = TrackerDeviceHealth(**values)
 
     # Пишем "последнее состояние" + при необходимости добавляем запись в лог.
     # Лог пишем не чаще чем раз в 30 секунд на устройство (чтобы не раздувать БД).
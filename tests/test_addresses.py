@@ -45,4 +45,87 @@ def test_address_crud(client):
     assert resp_del.status_code == 200
     # Адрес больше не возвращается
     resp_list3 = client.get('/api/addresses')
-    assert all(a['id'] != addr_id for a in resp_list3.get_json())
\ No newline at end of file
+    assert all(a['id'] != addr_id for a in resp_list3.get_json())
+
+def test_address_row_to_dict_matches_to_dict(app):
+    from app.extensions import db
+    from app.models import Address
+
+    with app.app_context():
+        addr = Address(name='a', lat=1.5, lon=2.5, notes='n', status='s', link='l',
+                       category='c', ai_tags=['x'], priority=3)
+        db.session.add(addr)
+        db.session.commit()
+        row = db.session.query(*Address.dict_columns()).filter(Address.id == addr.id).one()
+        assert Address.row_to_dict(row) == addr.to_dict()
+
+
+def test_address_cursor_pagination_walks_all_rows_once(app, client):
+    import uuid
+    from datetime import datetime
+
+    from app.extensions import db
+    from app.models import Address
+
+    # Своя категория на каждый прогон: БД тестов общая (app.db).
+    category = f'cursor-{uuid.uuid4().hex}'
+    with app.app_context():
+        # Две пары с одинаковым created_at: порядок внутри пары задаёт id.
+        stamps = [datetime(2026, 1, 1), datetime(2026, 1, 2), datetime(2026, 1, 2),
+                  datetime(2026, 1, 3), datetime(2026, 1, 3)]
+        rows = [Address(name=f'a{i}', category=category, created_at=ts) for i, ts in enumerate(stamps)]
+        db.session.add_all(rows)
+        db.session.commit()
+        expected = [a.id for a in sorted(rows, key=lambda a: (a.created_at, a.id), reverse=True)]
+
+    first = client.get('/api/addresses', query_string={'category': category, 'per_page': 2}).get_json()
+    assert first['total'] == len(expected)
+    seen = [a['id'] for a in first['items']]
+    cursor = first['next_cursor']
+    while cursor:
+        page = client.get('/api/addresses', query_string={'category': category, 'per_page': 2, 'after': cursor}).get_json()
+        seen += [a['id'] for a in page['items']]
+        cursor = page['next_cursor']
+    assert seen == expected
+
+    assert client.get('/api/addresses?after=bad').status_code == 400
+
+
+def test_address_photo_write_failure_keeps_old_photo(app, client, monkeypatch, tmp_path):
+    import io
+    import os
+
+    from werkzeug.datastructures import FileStorage
+
+    from app.extensions import db
+    from app.models import Address
+
+    upload_dir = tmp_path / 'uploads'
+    upload_dir.mkdir()
+    (upload_dir / 'old.jpg').write_bytes(b'old')
+    app.config['UPLOAD_FOLDER'] = str(upload_dir)
+    app.config['ADMIN_USERNAME'] = 'admin'
+    with app.app_context():
+        addr = Address(name='a', lat=1.0, lon=2.0, photo='old.jpg')
+        db.session.add(addr)
+        db.session.commit()
+        addr_id = addr.id
+
+    def fail_save(self, dst, buffer_size=16384):
+        with open(dst, 'wb') as fh:
+            fh.write(b'ne')
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(FileStorage, 'save', fail_save)
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+        sess['admin_username'] = 'admin'
+    resp = client.put(
+        f'/api/addresses/{addr_id}',
+        data={'name': 'b', 'photo': (io.BytesIO(b'new'), 'new.png')},
+        content_type='multipart/form-data',
+    )
+    assert resp.status_code == 200
+    with app.app_context():
+        assert db.session.get(Address, addr_id).photo == 'old.jpg'
+    assert os.listdir(upload_dir) == ['old.jpg']
@@ -15,4 +15,37 @@ def test_admin_summary(client):
     assert 'approved_count' in data
     assert 'rejected_count' in data
     assert 'new_addresses' in data
-    assert 'total_addresses' in data
\ No newline at end of file
+    assert 'total_addresses' in data
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value.encode('utf-8') if isinstance(value, str) else value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_admin_summary_cached_and_dropped_on_commit(app, client, monkeypatch):
+    from app.extensions import db
+    from app.models import Address
+
+    fake = _FakeRedis()
+    monkeypatch.setattr('app.admin.routes.get_redis', lambda: fake)
+    monkeypatch.setattr('app.models.get_redis', lambda: fake)
+
+    first = client.get('/admin/summary').get_json()
+    assert 'admin:summary' in fake.data
+    assert client.get('/admin/summary').get_json() == first
+
+    with app.app_context():
+        db.session.add(Address(name='x', lat=1.0, lon=2.0))
+        db.session.commit()
+    assert 'admin:summary' not in fake.data
+    after = client.get('/admin/summary').get_json()
+    assert after['addresses']['total'] == first['addresses']['total'] + 1
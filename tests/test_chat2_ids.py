@@ -0,0 +1,17 @@
+import uuid
+
+
+def test_chat2_rejects_non_uuid_ids(client):
+    with client.session_transaction() as sess:
+        sess["is_admin"] = True
+
+    r = client.post("/api/chat2/read", json={"channel_id": str(uuid.uuid4()), "last_read_message_id": "garbage"})
+    assert r.status_code == 400
+    assert r.get_json()["error"] == "invalid last_read_message_id"
+
+    r = client.get("/api/chat2/history", query_string={"channel_id": "nope"})
+    assert r.status_code == 400
+    assert r.get_json()["error"] == "invalid channel_id"
+
+    r = client.get("/api/chat2/sync", query_string={"channel_id": str(uuid.uuid4()), "after_id": "1"})
+    assert r.status_code == 400
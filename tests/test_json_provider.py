@@ -0,0 +1,32 @@
+import json
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from app.json_provider import OrjsonProvider
+
+
+def _app():
+    a = Flask(__name__)
+    a.json = OrjsonProvider(a)
+    return a
+
+
+def test_jsonify_matches_default_provider_output():
+    a = _app()
+    payload = {"b": 1, "a": [1.5, None, "имя"], 3: True, "ts": datetime(2026, 1, 2, 3, 4, 5)}
+    with a.app_context():
+        r = jsonify(payload)
+    assert r.mimetype == "application/json"
+    data = json.loads(r.get_data())
+    assert list(data) == ["3", "a", "b", "ts"]
+    assert data["a"] == [1.5, None, "имя"]
+    # datetime — в формате HTTP-даты, как у DefaultJSONProvider.
+    assert data["ts"] == "Fri, 02 Jan 2026 03:04:05 GMT"
+
+
+def test_dumps_falls_back_for_big_int_and_kwargs():
+    a = _app()
+    big = 2 ** 70
+    assert json.loads(a.json.dumps({"n": big})) == {"n": big}
+    assert a.json.dumps({"b": 1, "a": 2}, indent=1) == json.dumps({"a": 2, "b": 1}, indent=1)
@@ -151,3 +151,35 @@ def test_webapp_submit_publishes_pending_created_to_redis(client, app, monkeypat
     assert channel == "map_updates"
     assert payload.get("event") == "pending_created"
     assert isinstance(payload.get("data"), dict)
+
+
+def test_publish_events_sends_batch_in_one_pipeline(monkeypatch):
+    class _Pipeline:
+        def __init__(self, sent):
+            self._sent = sent
+            self._buf = []
+
+        def publish(self, channel, payload):
+            self._buf.append((channel, payload))
+
+        def execute(self):
+            self._sent.append(list(self._buf))
+
+    class _PipelineRedis:
+        sent = []
+
+        @classmethod
+        def from_url(cls, _url, decode_responses=True):
+            return cls()
+
+        def pipeline(self, transaction=True):
+            assert transaction is False
+            return _Pipeline(self.sent)
+
+    monkeypatch.setattr(broker_module, "Redis", _PipelineRedis)
+    broker = RedisBroker(redis_url="redis://fake")
+    payloads = [{"event": "tracking_point", "data": {"id": i}} for i in range(3)]
+
+    assert broker.publish_events("map_updates", payloads) is True
+    assert len(_PipelineRedis.sent) == 1
+    assert [json.loads(body)["data"]["id"] for _, body in _PipelineRedis.sent[0]] == [0, 1, 2]
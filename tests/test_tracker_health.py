@@ -0,0 +1,40 @@
+import hashlib
+import uuid
+
+import pytest
+
+from app.extensions import db
+from app.models import TrackerDevice, TrackerDeviceHealth
+
+
+@pytest.fixture(autouse=True)
+def patch_external(monkeypatch):
+    """Не шлём события в WebSocket."""
+    monkeypatch.setattr("app.tracker.routes.broadcast_event_sync", lambda event, payload: None)
+
+
+def test_health_upsert_keeps_one_row_per_device(app, client):
+    device_id = uuid.uuid4().hex[:16]
+    token = "tok-" + device_id
+    with app.app_context():
+        db.session.add(TrackerDevice(
+            public_id=device_id,
+            token_hash=hashlib.sha256(token.encode("utf-8")).hexdigest(),
+            user_id="42",
+        ))
+        db.session.commit()
+
+    headers = {"X-DEVICE-TOKEN": token}
+    r1 = client.post("/api/tracker/health", json={"battery_pct": 80, "net": "wifi"}, headers=headers)
+    assert r1.status_code == 200
+    r2 = client.post("/api/tracker/health", json={"battery_pct": 55, "gps": "ok"}, headers=headers)
+    assert r2.status_code == 200
+    assert r2.get_json()["health"]["battery_pct"] == 55
+
+    with app.app_context():
+        rows = TrackerDeviceHealth.query.filter_by(device_id=device_id).all()
+        assert len(rows) == 1
+        assert rows[0].user_id == "42"
+        assert rows[0].battery_pct == 55
+        assert rows[0].gps == "ok"
+        assert rows[0].net is None